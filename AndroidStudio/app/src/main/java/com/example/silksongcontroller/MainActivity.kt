@@ -6,6 +6,7 @@ import android.hardware.SensorEventListener
 import android.hardware.SensorManager
 import androidx.appcompat.app.AppCompatActivity
 import android.os.Bundle
+import android.os.SystemClock
 import android.view.WindowManager
 import android.widget.Button
 import android.widget.EditText
@@ -14,6 +15,8 @@ import kotlinx.coroutines.*
 import java.net.DatagramPacket
 import java.net.DatagramSocket
 import java.net.InetAddress
+import java.nio.ByteBuffer
+import java.nio.ByteOrder
 
 class MainActivity : AppCompatActivity(), SensorEventListener {
 
@@ -39,6 +42,13 @@ class MainActivity : AppCompatActivity(), SensorEventListener {
     private var lastSendTime: Long = 0
     private val SEND_INTERVAL_MS: Long = 30 // ~33 FPS
 
+    // Binary frame format (see sensor_protocol.py); set to false to send legacy SENSOR: text
+    private val USE_BINARY_FRAMES = true
+    private val FRAME_MAGIC: Byte = 0xA5.toByte()
+    private val FRAME_VERSION: Byte = 1
+    private val FRAME_SIZE = 32
+    private var sequenceNumber = 0
+
     override fun onCreate(savedInstanceState: Bundle?) {
         super.onCreate(savedInstanceState)
         setContentView(R.layout.activity_main) // Your XML layout from the previous step
@@ -103,12 +113,10 @@ class MainActivity : AppCompatActivity(), SensorEventListener {
 
     private fun sendSensorData() {
         // Send only the 4 values that Python expects: accel_x, accel_y, accel_z, gyro_y
-        val message = "SENSOR:" +
-                "${accelData[0]},${accelData[1]},${accelData[2]},${gyroData[1]}"
+        val buffer = if (USE_BINARY_FRAMES) encodeFrame() else encodeText()
 
         coroutineScope.launch {
             try {
-                val buffer = message.toByteArray()
                 val packet = DatagramPacket(buffer, buffer.size, targetAddress, TARGET_PORT)
                 udpSocket?.send(packet)
             } catch (e: Exception) {
@@ -117,6 +125,28 @@ class MainActivity : AppCompatActivity(), SensorEventListener {
         }
     }
 
+    private fun encodeText(): ByteArray {
+        // Optional trailing seq and sender timestamp let the listener detect loss and jitter
+        val message = "SENSOR:" +
+                "${accelData[0]},${accelData[1]},${accelData[2]},${gyroData[1]}," +
+                "${sequenceNumber++},${SystemClock.elapsedRealtimeNanos()}"
+        return message.toByteArray()
+    }
+
+    private fun encodeFrame(): ByteArray {
+        val frame = ByteBuffer.allocate(FRAME_SIZE).order(ByteOrder.LITTLE_ENDIAN)
+        frame.put(FRAME_MAGIC)
+        frame.put(FRAME_VERSION)
+        frame.putShort(0) // device_id: unspecified
+        frame.putInt(sequenceNumber++)
+        frame.putLong(SystemClock.elapsedRealtimeNanos())
+        frame.putFloat(accelData[0])
+        frame.putFloat(accelData[1])
+        frame.putFloat(accelData[2])
+        frame.putFloat(gyroData[1])
+        return frame.array()
+    }
+
     override fun onAccuracyChanged(sensor: Sensor?, accuracy: Int) {}
 
     override fun onPause() {
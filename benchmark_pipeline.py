@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Pipeline benchmark driven by the recordings in gesture_data/.
+
+Runs every recorded clip through the listener's detection logic with a null
+key output and reports throughput plus p50/p99/max per-sample time for each
+stage. Results are written to JSON so runs can be compared across commits;
+with --baseline the script exits non-zero if throughput regressed by more
+than --max-regression.
+
+Usage:
+    python3 benchmark_pipeline.py
+    python3 benchmark_pipeline.py --baseline benchmark_results.json --max-regression 0.10
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import udp_listener as listener
+from gesture_engine import SAMPLE_INTERVAL_S, GestureEngine
+from gesture_store import DATA_DIR, load_traces
+from key_backends import create_backend
+from key_worker import KeyInjectionWorker
+from sensor_protocol import SensorSample
+
+STAGES = ("state", "rotation", "features", "action", "walking_key", "sustained_jump", "pipeline")
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class TimedEngine(GestureEngine):
+    """GestureEngine whose manage_* helpers record their time when act() calls them."""
+
+    def __init__(self, timings, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = timings
+
+    def manage_walking_key_press(self, should_walk, direction_key, actions):
+        t0 = time.perf_counter_ns()
+        result = super().manage_walking_key_press(should_walk, direction_key, actions)
+        self.timings["walking_key"].append(time.perf_counter_ns() - t0)
+        return result
+
+    def manage_sustained_jump(self, x, y, z, jerk_force, current_time, actions):
+        t0 = time.perf_counter_ns()
+        result = super().manage_sustained_jump(x, y, z, jerk_force, current_time, actions)
+        self.timings["sustained_jump"].append(time.perf_counter_ns() - t0)
+        return result
+
+
+def time_stages(engine, clip, timings):
+    """Time the engine's own stage methods on one clip, in listener order.
+
+    "action" is the whole act() call; walking_key and sustained_jump are the
+    manage_* calls it makes, so they are included in it.
+    """
+    ns = time.perf_counter_ns
+    engine.reset()
+    for i, (x, y, z, gyro_y) in enumerate(clip):
+        current_time = i * SAMPLE_INTERVAL_S
+        t0 = ns()
+        engine.update_state(x, y, z)
+        t1 = ns()
+        engine.update_rotation(gyro_y, current_time)
+        t2 = ns()
+        jerk_force = engine.update_features(x, y, z)
+        t3 = ns()
+        engine.act(x, y, z, jerk_force, current_time)
+        t4 = ns()
+        timings["state"].append(t1 - t0)
+        timings["rotation"].append(t2 - t1)
+        timings["features"].append(t3 - t2)
+        timings["action"].append(t4 - t3)
+
+
+def time_batch(clips):
+    """Best-case throughput of GestureEngine.run_batch over all clips (samples/s)."""
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+    engine = GestureEngine(listener.CALIBRATION_PROFILE, listener.action_cooldown)
+    arrays = [np.asarray(clip, dtype=np.float64) for clip in clips]
+    start = time.perf_counter_ns()
+    for array in arrays:
+        engine.run_batch(array)
+    elapsed_ns = time.perf_counter_ns() - start
+    return sum(len(a) for a in arrays) / (elapsed_ns / 1e9) if elapsed_ns else 0.0
+
+
+def time_pipeline(clip, timings):
+    """Run one clip through the real sensor + output stages; returns elapsed ns."""
+    ns = time.perf_counter_ns
+    listener.reset_state()
+    start = ns()
+    for i, (x, y, z, gyro_y) in enumerate(clip):
+        t0 = ns()
+        current_time = i * SAMPLE_INTERVAL_S
+        sample = SensorSample(x, y, z, gyro_y)
+        jerk_force = listener.process_sensor_sample(sample, current_time)
+        listener.run_output_stage(x, y, z, jerk_force, current_time)
+        timings["pipeline"].append(ns() - t0)
+    return ns() - start
+
+
+def run_benchmark(traces, repeat):
+    listener.key_output = KeyInjectionWorker(create_backend("null"))
+    listener.key_output.start()
+    listener.quiet = True
+    results = {}
+    for name, clips in traces.items():
+        timings = {stage: [] for stage in STAGES}
+        engine = TimedEngine(timings, listener.CALIBRATION_PROFILE, listener.action_cooldown)
+        samples = sum(len(clip) for clip in clips)
+        best_ns = None
+        for _ in range(repeat):
+            pass_ns = 0
+            for clip in clips:
+                time_stages(engine, clip, timings)
+                pass_ns += time_pipeline(clip, timings)
+            # Best pass is the least noisy throughput estimate
+            if best_ns is None or pass_ns < best_ns:
+                best_ns = pass_ns
+        batch_rates = [time_batch(clips) for _ in range(repeat)]
+
+        stages = {}
+        for stage, values in timings.items():
+            if not values:
+                continue
+            values.sort()
+            stages[stage] = {
+                "samples": len(values),
+                "p50_ns": percentile(values, 0.50),
+                "p99_ns": percentile(values, 0.99),
+                "max_ns": values[-1],
+            }
+        results[name] = {
+            "samples": samples,
+            "samples_per_sec": round(samples / (best_ns / 1e9), 1) if best_ns else 0.0,
+            "batch_samples_per_sec": round(max(batch_rates), 1) if batch_rates[0] is not None else None,
+            "stages": stages,
+        }
+    listener.key_output.stop()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results):
+    print(f"{'trace':<12} {'stage':<16} {'p50 µs':>8} {'p99 µs':>8} {'max µs':>9}")
+    for name, result in results.items():
+        for stage, s in result["stages"].items():
+            print(f"{name:<12} {stage:<16} {s['p50_ns'] / 1e3:8.2f} {s['p99_ns'] / 1e3:8.2f} "
+                  f"{s['max_ns'] / 1e3:9.2f}")
+        print(f"{name:<12} {'throughput':<16} {result['samples_per_sec']:,.0f} samples/s")
+        if result.get("batch_samples_per_sec"):
+            print(f"{name:<12} {'batch':<16} {result['batch_samples_per_sec']:,.0f} samples/s")
+        print()
+
+
+def check_regression(results, baseline_path, max_regression):
+    """Return a list of regression messages against a previous results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["traces"]
+    failures = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old_rate = baseline[name]["samples_per_sec"]
+        new_rate = result["samples_per_sec"]
+        if old_rate and new_rate < old_rate * (1 - max_regression):
+            failures.append(f"{name}: {new_rate:,.0f} samples/s vs baseline {old_rate:,.0f} "
+                            f"({(1 - new_rate / old_rate) * 100:.1f}% slower)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the listener pipeline on gesture_data")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over each recording")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="Allowed throughput drop vs baseline (fraction)")
+    args = parser.parse_args()
+
+    traces = load_traces(args.data_dir)
+    if not traces:
+        print(f"❌ No recordings found in {args.data_dir}/")
+        return 1
+
+    results = run_benchmark(traces, args.repeat)
+    print_report(results)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "traces": results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results written to {args.output}")
+
+    if args.baseline:
+        failures = check_regression(results, args.baseline, args.max_regression)
+        if failures:
+            print("❌ Throughput regression:")
+            for failure in failures:
+                print(f"   {failure}")
+            return 1
+        print(f"✅ No regression beyond {args.max_regression * 100:.0f}% vs {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,185 @@
+import bisect
 import socket
+import threading
 import time
-import json
 import os
+from array import array
+from gesture_store import AXES, write_recording
+from sensor_protocol import MAX_PACKET_SIZE, ProtocolError, decode_packet
 
 HOST_IP = '0.0.0.0'
 PORT = 12345
 OUTPUT_DIR = "gesture_data"
+SESSION_DIR = os.path.join(OUTPUT_DIR, "sessions")  # Not scanned by the loaders
+INITIAL_CAPACITY = 1 << 16  # Samples preallocated per column (~30 min at 33 Hz)
+END_GRACE_S = 0.05  # Wait for packets sent just before a clip ends
+RING_POLL_S = 0.002  # Idle wait when reading from a shared-memory ring
 
-def record_action(action_name, num_samples=5, duration_s=2.5):
-    """Guides the user to record multiple samples of a single action and saves the raw data to a JSON file."""
+
+class ContinuousRecorder:
+    """Captures every sensor packet on a background thread.
+
+    Samples go into preallocated columns (host monotonic_ns timestamps plus
+    one float32 column per axis), so a whole calibration session is one
+    stream. Prompts only take timestamps with mark(); clips are cut from the
+    stream by timestamp afterwards, so packets that queued up during a
+    countdown can never end up in the next clip.
+
+    With `shm` set, samples are read from a running listener's shared-memory
+    ring (udp_listener.py --shm NAME) instead of binding the sensor port, so
+    gestures can be recorded while the controller is playing.
+    """
+
+    def __init__(self, host=HOST_IP, port=PORT, capacity=INITIAL_CAPACITY, shm=None):
+        self.host = host
+        self.port = port
+        self.shm = shm
+        self.columns = {"timestamp_ns": array('q', bytes(8 * capacity)),
+                        **{axis: array('f', bytes(4 * capacity)) for axis in AXES}}
+        self.capacity = capacity
+        self.count = 0
+        self.rejected = 0
+        self.clips = []  # (action, start_ns, end_ns)
+        self._sock = None
+        self._ring = None
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        self._running = True
+        if self.shm:
+            from sample_ring import SampleRingReader
+            self._ring = SampleRingReader(self.shm)
+            target = self._run_ring
+        else:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sock.bind((self.host, self.port))
+            target = self._run
+        self._thread = threading.Thread(target=target, name="calibration-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._running = False
+        if self.shm:
+            self._thread.join()
+            self._thread = None
+            self._ring.close()
+            return
+        # Wake the blocking recvfrom_into with an empty datagram instead of polling
+        host, port = self._sock.getsockname()
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.sendto(b"", ('127.0.0.1' if host == '0.0.0.0' else host, port))
+        self._thread.join()
+        self._thread = None
+        self._sock.close()
+
+    def _run(self):
+        buffer = bytearray(MAX_PACKET_SIZE)
+        view = memoryview(buffer)
+        recv_into = self._sock.recvfrom_into
+        ts = self.columns["timestamp_ns"]
+        ax, ay, az, gy = (self.columns[axis] for axis in AXES)
+        while True:
+            nbytes, _ = recv_into(buffer)
+            arrival_ns = time.monotonic_ns()
+            if not self._running:
+                return
+            try:
+                sample = decode_packet(view, nbytes)
+            except ProtocolError:
+                self.rejected += 1
+                continue
+            i = self.count
+            if i == self.capacity:
+                self._grow()
+            ts[i] = arrival_ns
+            ax[i] = sample.x
+            ay[i] = sample.y
+            az[i] = sample.z
+            gy[i] = sample.gyro_y
+            self.count = i + 1  # Publish only after the row is complete
+
+    def _run_ring(self):
+        ts = self.columns["timestamp_ns"]
+        ax, ay, az, gy = (self.columns[axis] for axis in AXES)
+        read = self._ring.read
+        while self._running:
+            samples = read()
+            if not samples:
+                time.sleep(RING_POLL_S)
+                continue
+            for arrival_ns, sample in samples:
+                i = self.count
+                if i == self.capacity:
+                    self._grow()
+                ts[i] = arrival_ns
+                ax[i] = sample.x
+                ay[i] = sample.y
+                az[i] = sample.z
+                gy[i] = sample.gyro_y
+                self.count = i + 1
+
+    def _grow(self):
+        """Double every column in place (rare: only past the preallocated size)."""
+        for column in self.columns.values():
+            column.extend(array(column.typecode, bytes(column.itemsize * self.capacity)))
+        self.capacity *= 2
+
+    def mark(self):
+        """Current time on the recorder's clock (monotonic ns)."""
+        return time.monotonic_ns()
+
+    def index_at(self, t_ns):
+        """Index of the first sample received at or after t_ns."""
+        return bisect.bisect_left(self.columns["timestamp_ns"], t_ns, 0, self.count)
+
+    def add_clip(self, action, start_ns, end_ns):
+        """Mark [start_ns, end_ns) as one clip of `action`; returns its sample count."""
+        self.clips.append((action, start_ns, end_ns))
+        return self.index_at(end_ns) - self.index_at(start_ns)
+
+    def slice_columns(self, start, stop):
+        return {name: column[start:stop] for name, column in self.columns.items()}
+
+    def save_action(self, action, path):
+        """Write every clip of `action` to one .gcol file."""
+        columns = {name: array(column.typecode) for name, column in self.columns.items()}
+        clip_offsets = [0]
+        for name, start_ns, end_ns in self.clips:
+            if name != action:
+                continue
+            for column_name, values in self.slice_columns(self.index_at(start_ns),
+                                                          self.index_at(end_ns)).items():
+                columns[column_name].extend(values)
+            clip_offsets.append(len(columns["timestamp_ns"]))
+        write_recording(path, columns, clip_offsets, {
+            "action": action,
+            "source": "calibrate.py",
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "timestamp_clock": "monotonic_ns",
+        })
+
+    def save_session(self, path):
+        """Write the whole stream as one clip, with every marked clip as index ranges."""
+        markers = [{"action": action, "start": self.index_at(start_ns), "end": self.index_at(end_ns)}
+                   for action, start_ns, end_ns in self.clips]
+        write_recording(path, self.slice_columns(0, self.count), [0, self.count], {
+            "action": "session",
+            "source": "calibrate.py",
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "timestamp_clock": "monotonic_ns",
+            "markers": markers,
+        })
+
+
+def record_action(action_name, num_samples=5, duration_s=2.5, recorder=None):
+    """Guides the user to record multiple samples of a single action and saves the raw data to a .gcol file.
+
+    With a running ContinuousRecorder the clips are cut from its stream;
+    otherwise a recorder is started just for this action.
+    """
     
     print(f"\n{'='*50}")
     print(f"ACTION: {action_name.upper()}")
@@ -27,64 +198,51 @@ def record_action(action_name, num_samples=5, duration_s=2.5):
         
     input(f"\nGet ready to perform '{action_name}' {num_samples} times. Press Enter to begin...")
 
-    all_samples_data = []
-
-    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-        s.bind((HOST_IP, PORT))
-        s.settimeout(0.1)  # Use a timeout to avoid blocking forever
-
-        for i in range(num_samples):
-            print(f"\n  Recording sample {i+1}/{num_samples} in 3 seconds...")
-            time.sleep(1)
-            print("  2...")
-            time.sleep(1)
-            print("  1...")
-            time.sleep(1)
-            print("  🎬 PERFORM ACTION NOW! 🎬")
-
-            sample_readings = []
-            start_time = time.time()
-            
-            while time.time() - start_time < duration_s:
-                try:
-                    data, _ = s.recvfrom(1024)
-                    message = data.decode().strip()
-                    if message.startswith("SENSOR:"):
-                        parts = message.replace("SENSOR:", "").split(',')
-                        if len(parts) >= 4:
-                            x, y, z, gyro_y = [float(p) for p in parts]
-                            
-                            reading = {
-                                "timestamp_ms": int((time.time() - start_time) * 1000),
-                                "accel_x": x,
-                                "accel_y": y,
-                                "accel_z": z,
-                                "gyro_y": gyro_y
-                            }
-                            sample_readings.append(reading)
-
-                except socket.timeout:
-                    # No data received, just continue
-                    continue
-            
-            all_samples_data.append(sample_readings)
-            print(f"  ✅ Sample {i+1} complete. Recorded {len(sample_readings)} data points.")
-            
-            if i < num_samples - 1:
-                print("  Rest for a moment before the next sample...")
-                time.sleep(2)
+    own_recorder = recorder is None
+    if own_recorder:
+        recorder = ContinuousRecorder()
+        recorder.start()
+
+    # The recorder keeps capturing during countdowns and rests; each clip is
+    # just a [start, end) time range on its stream
+    for i in range(num_samples):
+        print(f"\n  Recording sample {i+1}/{num_samples} in 3 seconds...")
+        time.sleep(1)
+        print("  2...")
+        time.sleep(1)
+        print("  1...")
+        time.sleep(1)
+        print("  🎬 PERFORM ACTION NOW! 🎬")
+
+        start_ns = recorder.mark()
+        end_ns = start_ns + int(duration_s * 1e9)
+        time.sleep(duration_s + END_GRACE_S)
+        points = recorder.add_clip(action_name.lower(), start_ns, end_ns)
+        print(f"  ✅ Sample {i+1} complete. Recorded {points} data points.")
+        
+        if i < num_samples - 1:
+            print("  Rest for a moment before the next sample...")
+            time.sleep(2)
 
     # Save the recorded data to a file
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
         
-    file_path = os.path.join(OUTPUT_DIR, f"{action_name.lower()}_data.json")
-    with open(file_path, 'w') as f:
-        json.dump(all_samples_data, f, indent=2)
+    file_path = os.path.join(OUTPUT_DIR, f"{action_name.lower()}.gcol")
+    recorder.save_action(action_name.lower(), file_path)
+    if own_recorder:
+        recorder.stop()
         
     print(f"\n💾 Successfully saved raw data to: {file_path}")
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record calibration gestures")
+    parser.add_argument("--shm", metavar="NAME",
+                        help="Read samples from a running udp_listener.py --shm NAME instead of the UDP port")
+    args = parser.parse_args()
+
     actions_to_record = [
         "punch",
         "jump", 
@@ -102,16 +260,27 @@ if __name__ == "__main__":
     
     input("\nPress Enter when ready to start recording...")
 
-    for action in actions_to_record:
-        record_action(action)
+    # One recorder for the whole session: every packet lands in a single stream
+    recorder = ContinuousRecorder(shm=args.shm)
+    recorder.start()
+    try:
+        for action in actions_to_record:
+            record_action(action, recorder=recorder)
+    finally:
+        recorder.stop()
+    os.makedirs(SESSION_DIR, exist_ok=True)
+    session_path = os.path.join(SESSION_DIR, f"session-{time.strftime('%Y%m%d-%H%M%S')}.gcol")
+    recorder.save_session(session_path)
 
     print(f"\n{'='*60}")
     print("🎉 ALL RECORDINGS COMPLETE!")
     print(f"📂 Raw data files saved in the '{OUTPUT_DIR}/' directory:")
     print()
     for action in actions_to_record:
-        print(f"   📄 {action.lower()}_data.json")
+        print(f"   📄 {action.lower()}.gcol")
+    print(f"   📄 {os.path.relpath(session_path, OUTPUT_DIR)} (full stream, {recorder.count} samples)")
     print()
+    print("📄 Export JSON copies with: python3 gesture_store.py export gesture_data/*.gcol")
     print("🤖 You can now provide these JSON files to an AI for pattern analysis.")
     print("🧠 The AI will learn YOUR personal motion signatures and build")
     print("   a controller that feels natural and responsive to YOU.")
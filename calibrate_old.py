@@ -2,6 +2,7 @@ import socket
 import time
 import math
 import statistics
+from sensor_protocol import PacketReceiver, ProtocolError
 
 HOST_IP = "0.0.0.0"
 PORT = 12345
@@ -14,19 +15,18 @@ def get_gesture_data(duration=3):
     with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
         s.bind((HOST_IP, PORT))
         s.settimeout(0.1)  # Don't block forever
+        receiver = PacketReceiver(s)
 
         print("  Recording...")
         start_time = time.time()
         while time.time() - start_time < duration:
             try:
-                data, _ = s.recvfrom(1024)
-                message = data.decode().strip()
-                if message.startswith("SENSOR:"):
-                    parts = message.replace("SENSOR:", "").split(",")
-                    if len(parts) >= 4:
-                        readings.append([float(p) for p in parts])
+                sample, _ = receiver.receive()
+                readings.append([sample.x, sample.y, sample.z, sample.gyro_y])
             except socket.timeout:
                 continue
+            except ProtocolError:
+                continue
     print(f"  Recorded {len(readings)} data points.")
     return readings
 
@@ -0,0 +1,3 @@
+# Root conftest: puts the flat modules on sys.path for tests/ and keeps pytest
+# from collecting test_udp_protocol.py, which is an interactive UDP inspector
+collect_ignore = ["test_udp_protocol.py"]
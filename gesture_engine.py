@@ -0,0 +1,464 @@
+"""
+Gesture detection engine for the motion controller.
+
+GestureEngine holds all controller state that used to live in module
+globals in udp_listener.py, so several independent controllers can run in
+one process and the logic can be driven from recordings. It emits key
+actions instead of pressing keys itself; the caller decides where they go.
+
+    engine = GestureEngine(CALIBRATION_PROFILE)
+    for action in engine.step(sample, time.time()):
+        key_output.submit(action.kind, action.key)
+
+run_batch() evaluates a whole recording at once: magnitudes, jerk, raw and
+stable states and rotation are computed with NumPy, and only the cooldown /
+key-hold logic is stepped sample by sample.
+
+Windowed features use rolling_stats, so they cost O(1) per sample whatever
+the window size: the state consensus counts (STATE_BUFFER_SIZE), a
+moving-average magnitude for jerk (MAGNITUDE_WINDOW) and the peak |z| used
+as walking swing (SWING_WINDOW). Windows of 1 reproduce the single-sample
+behaviour and skip the window entirely.
+
+ONSET_CONFIDENCE > 0 lets punch and jump fire on a rising edge that is
+predicted to cross the threshold (onset_predictor.py) instead of waiting
+for the crossing sample.
+"""
+
+import math
+from typing import Any, NamedTuple
+
+from key_worker import PRESS, RELEASE, TAP
+from onset_predictor import DEFAULT_HORIZON, DEFAULT_WINDOW, OnsetPredictor
+from rolling_stats import CategoryWindow, RollingWindow
+
+GRAVITY_CONSTANT = 9.81  # Earth's gravity constant
+GRAVITY_THRESHOLD = 9.0
+TURN_THRESHOLD = 1.57  # Radians of rotation before walking direction flips
+SAMPLE_INTERVAL_S = 0.03  # Android send interval, used when a recording has no usable timestamps
+
+DEFAULT_PROFILE = {
+    'PUNCH_THRESHOLD': 10.0,
+    'JUMP_THRESHOLD': 12.0,
+    'WALK_SWING_AMPLITUDE': 3.0,
+    'WALK_GYRO_NOISE_LIMIT': 0.5,
+}
+DEFAULT_ACTION_COOLDOWN = 0.3
+DEFAULT_BUFFER_SIZE = 5
+DEFAULT_MAGNITUDE_WINDOW = 1  # Samples averaged into the magnitude used for jerk
+DEFAULT_SWING_WINDOW = 1  # Samples over which the peak |z| counts as walking swing
+DEFAULT_ONSET_CONFIDENCE = 0  # Fraction of the threshold at which a predicted rise fires (0 = off)
+
+# Logical key names; the listener maps these to real keys for its backend
+DEFAULT_KEYMAP = {
+    'walk_right': 'right',
+    'walk_left': 'left',
+    'jump': 'z',
+    'attack': 'x',
+}
+
+STATES = ("IDLE", "WALKING", "COMBAT")  # Index = state code used by run_batch
+NO_ACTIONS = ()
+
+
+class Action(NamedTuple):
+    """One key operation produced by the engine."""
+    name: str   # e.g. PUNCH, JUMP_START, WALK_KEY_PRESS
+    kind: str   # PRESS / RELEASE / TAP
+    key: Any
+
+
+class BatchResult(NamedTuple):
+    """Output of GestureEngine.run_batch for one recording."""
+    jerk: Any        # ndarray, jerk force per sample
+    raw_states: Any  # ndarray of state codes (index into STATES)
+    states: Any      # ndarray of stable state codes after the consensus buffer
+    rotation: Any    # ndarray, integrated rotation in radians
+    actions: list    # [(sample_index, Action), ...]
+
+
+def load_profile(path):
+    """Load a calibration profile JSON file (e.g. from tune_thresholds.py).
+
+    Only upper-case keys are returned; anything else in the file (such as
+    the tuner's score report) is ignored.
+    """
+    import json
+
+    with open(path) as f:
+        data = json.load(f)
+    return {key: value for key, value in data.items() if key.isupper()}
+
+
+def determine_state_from_sensors(x, y, z):
+    """Determine raw state from sensor readings"""
+    if abs(y) > GRAVITY_THRESHOLD:
+        return "COMBAT"
+    elif abs(x) > GRAVITY_THRESHOLD:
+        return "WALKING"
+    else:
+        return "IDLE"
+
+
+class GestureEngine:
+    """State machine for one controller: stability buffer, rotation, walk/jump/punch."""
+
+    __slots__ = (
+        # Configuration
+        "punch_threshold", "jump_threshold", "walk_swing_amplitude",
+        "walk_gyro_noise_limit", "action_cooldown", "buffer_size", "consensus", "keymap",
+        # State
+        "last_action_time", "is_walking", "walking_key_pressed", "current_walking_key",
+        "jump_key_pressed", "initial_gyro_heading", "total_rotation", "last_time",
+        "current_state", "state_buffer", "last_action", "last_action_value",
+        "magnitude_window", "swing_window", "swing", "matched_turns", "onset",
+    )
+
+    def __init__(self, profile=None, action_cooldown=None, buffer_size=None, keymap=None):
+        """`profile` may also carry ACTION_COOLDOWN and STATE_BUFFER_SIZE (as
+        written by tune_thresholds.py), the MAGNITUDE_WINDOW / SWING_WINDOW
+        sizes and the ONSET_* settings; explicit arguments take precedence."""
+        profile = {**DEFAULT_PROFILE, **(profile or {})}
+        if action_cooldown is None:
+            action_cooldown = profile.get('ACTION_COOLDOWN', DEFAULT_ACTION_COOLDOWN)
+        if buffer_size is None:
+            buffer_size = int(profile.get('STATE_BUFFER_SIZE', DEFAULT_BUFFER_SIZE))
+        self.punch_threshold = profile['PUNCH_THRESHOLD']
+        self.jump_threshold = profile['JUMP_THRESHOLD']
+        self.walk_swing_amplitude = profile['WALK_SWING_AMPLITUDE']
+        self.walk_gyro_noise_limit = profile['WALK_GYRO_NOISE_LIMIT']
+        self.action_cooldown = action_cooldown
+        self.buffer_size = buffer_size
+        self.consensus = math.ceil(buffer_size * 0.8)  # 4 of 5 by default
+        self.keymap = {**DEFAULT_KEYMAP, **(keymap or {})}
+        self.state_buffer = CategoryWindow(buffer_size, STATES)  # Rolling state counts for stability
+        magnitude_window = int(profile.get('MAGNITUDE_WINDOW', DEFAULT_MAGNITUDE_WINDOW))
+        swing_window = int(profile.get('SWING_WINDOW', DEFAULT_SWING_WINDOW))
+        self.magnitude_window = (RollingWindow(magnitude_window, track_max=False, track_min=False)
+                                 if magnitude_window > 1 else None)
+        self.swing_window = (RollingWindow(swing_window, track_min=False)
+                             if swing_window > 1 else None)
+        onset_confidence = float(profile.get('ONSET_CONFIDENCE', DEFAULT_ONSET_CONFIDENCE))
+        self.onset = (OnsetPredictor(onset_confidence,
+                                     int(profile.get('ONSET_WINDOW', DEFAULT_WINDOW)),
+                                     int(profile.get('ONSET_HORIZON', DEFAULT_HORIZON)))
+                      if onset_confidence > 0 else None)
+        self.reset()
+
+    def reset(self):
+        """Return to the startup state (forward direction not yet set)."""
+        self.last_action_time = float('-inf')
+        self.is_walking = False
+        self.walking_key_pressed = False  # Track if we're currently holding a walking key
+        self.current_walking_key = None   # Track which key is currently pressed
+        self.jump_key_pressed = False     # Track if jump key is currently held
+        self.initial_gyro_heading = None
+        self.total_rotation = 0.0
+        self.last_time = None
+        self.current_state = "IDLE"
+        self.state_buffer.clear()
+        if self.magnitude_window is not None:
+            self.magnitude_window.clear()
+        if self.swing_window is not None:
+            self.swing_window.clear()
+        if self.onset is not None:
+            self.onset.reset()
+        self.swing = 0.0
+        self.matched_turns = 0
+        self.last_action = "NONE"
+        self.last_action_value = 0.0
+
+    @property
+    def facing_dir(self):
+        return "RIGHT" if self.total_rotation < TURN_THRESHOLD else "LEFT"
+
+    @property
+    def rotation_deg(self):
+        return math.degrees(self.total_rotation)
+
+    def turn_around(self):
+        """Apply a turn recognised by template matching.
+
+        A matched turn flips the current facing direction. total_rotation is
+        set to the new direction's canonical angle, so gyro integration of
+        the same turn cannot flip it back.
+        """
+        self.matched_turns += 1
+        self.total_rotation = 0.0 if self.facing_dir == "LEFT" else math.pi
+        self.last_action = "TURN_MATCH"
+
+    # --- Per-sample API ---
+
+    def step(self, sample, current_time, sender_dt=None):
+        """Process one sample and return the key actions it triggers."""
+        jerk_force = self.update(sample, current_time, sender_dt)
+        return self.act(sample.x, sample.y, sample.z, jerk_force, current_time)
+
+    def update(self, sample, current_time, sender_dt=None):
+        """Sensor stage: stability buffer and rotation tracking. Returns jerk force."""
+        x, y, z = sample.x, sample.y, sample.z
+        self.update_state(x, y, z)
+        self.update_rotation(sample.gyro_y, current_time, sender_dt)
+        return self.update_features(x, y, z)
+
+    def update_state(self, x, y, z):
+        """Raw state from gravity, filtered through the stability buffer."""
+        # Consensus can only move to the newest raw state: every other state's
+        # count just stayed the same or dropped, so one count check is enough
+        raw_state = determine_state_from_sensors(x, y, z)
+        if self.state_buffer.append(raw_state) >= self.consensus:
+            self.current_state = raw_state
+
+    def update_rotation(self, gyro_y, current_time, sender_dt=None):
+        """Integrate gyro_y relative to the initial heading into total_rotation."""
+        # --- Set Initial "Forward" Direction ---
+        if self.initial_gyro_heading is None:
+            self.initial_gyro_heading = gyro_y
+
+        if sender_dt is not None:
+            delta_time = sender_dt
+        elif self.last_time is not None:
+            delta_time = current_time - self.last_time
+        else:
+            delta_time = 0.0
+        self.last_time = current_time
+
+        effective_gyro = gyro_y - self.initial_gyro_heading
+        if abs(effective_gyro) > self.walk_gyro_noise_limit:
+            self.total_rotation += effective_gyro * delta_time
+
+    def update_features(self, x, y, z):
+        """Walking swing and jerk force for the action stage. Returns jerk force."""
+        # Walking swing: peak |z| over the swing window
+        if self.swing_window is not None:
+            self.swing_window.push(abs(z))
+            self.swing = self.swing_window.max
+        else:
+            self.swing = abs(z)
+
+        # Jerk force used by punch/jump detection
+        magnitude = math.sqrt(x**2 + y**2 + z**2)
+        if self.magnitude_window is not None:
+            self.magnitude_window.push(magnitude)
+            magnitude = self.magnitude_window.mean
+        jerk_force = magnitude - GRAVITY_CONSTANT
+        if self.onset is not None:
+            self.onset.push(jerk_force)
+        return jerk_force
+
+    def act(self, x, y, z, jerk_force, current_time):
+        """Output stage: walking, jump and punch decisions for one sample."""
+        # Cooldown check
+        if current_time - self.last_action_time < self.action_cooldown:
+            return NO_ACTIONS
+
+        actions = []
+        if self.current_state == "WALKING":
+            # Check for swing amplitude to determine if actively walking
+            currently_walking = self.swing > self.walk_swing_amplitude
+
+            # Determine direction based on rotation
+            direction_key = (self.keymap['walk_right'] if self.total_rotation < TURN_THRESHOLD
+                             else self.keymap['walk_left'])
+
+            # Manage sustained key press for walking
+            key_action = self.manage_walking_key_press(currently_walking, direction_key, actions)
+            if key_action:
+                self.last_action = key_action
+                self.last_action_value = self.swing
+
+            # Update walking state for display
+            self.is_walking = currently_walking
+
+            # Use sustained jump logic instead of single tap
+            jump_action = self.manage_sustained_jump(x, y, z, jerk_force, current_time, actions)
+            if jump_action and jump_action != "JUMP_CONTINUE":
+                # Only update timing for start/end actions, not continue
+                self.last_action_time = current_time
+
+        elif self.current_state == "COMBAT":
+            self.is_walking = False
+
+            # CORRECTED PUNCH PHYSICS - Measure actual jerk force
+            if jerk_force > self.punch_threshold or (
+                    self.onset is not None and self.onset.will_cross(self.punch_threshold)):
+                actions.append(Action("PUNCH", TAP, self.keymap['attack']))
+                self.last_action = "PUNCH"
+                self.last_action_value = jerk_force
+                self.last_action_time = current_time
+
+        return actions
+
+    def manage_sustained_jump(self, x, y, z, jerk_force, current_time, actions):
+        """Handle sustained jump based on acceleration patterns"""
+        total_acceleration = math.sqrt(x**2 + y**2 + z**2)
+        jump_key = self.keymap['jump']
+
+        # JUMP START: Strong upward jerk detected
+        if not self.jump_key_pressed and (jerk_force > self.jump_threshold or (
+                self.onset is not None and self.onset.will_cross(self.jump_threshold))):
+            actions.append(Action("JUMP_START", PRESS, jump_key))
+            self.jump_key_pressed = True
+            self.last_action = "JUMP_START"
+            self.last_action_value = jerk_force
+            self.last_action_time = current_time
+            return "JUMP_START"
+
+        # JUMP CONTINUE: Low total acceleration indicates "airborne" state
+        # (When phone is suspended/floating, total acceleration approaches gravity)
+        elif self.jump_key_pressed and total_acceleration < 12.0:  # Slightly above gravity
+            # Keep holding jump key while "airborne"
+            self.last_action = "JUMP_AIRBORNE"
+            self.last_action_value = total_acceleration
+            return "JUMP_CONTINUE"
+
+        # JUMP END: High acceleration spike indicates landing or strong movement
+        elif self.jump_key_pressed and (jerk_force > self.jump_threshold * 0.7 or total_acceleration > 15.0):
+            actions.append(Action("JUMP_END", RELEASE, jump_key))
+            self.jump_key_pressed = False
+            self.last_action = "JUMP_LAND"
+            self.last_action_value = total_acceleration
+            self.last_action_time = current_time
+            return "JUMP_END"
+
+        return None
+
+    def manage_walking_key_press(self, should_walk, direction_key, actions):
+        """Handle sustained key press for walking"""
+        if should_walk and not self.walking_key_pressed:
+            # Start walking - press and hold key
+            actions.append(Action("WALK_KEY_PRESS", PRESS, direction_key))
+            self.walking_key_pressed = True
+            self.current_walking_key = direction_key
+            return "WALK_KEY_PRESS"
+        elif should_walk and self.walking_key_pressed and self.current_walking_key != direction_key:
+            # Direction changed - release old key, press new key
+            actions.append(Action("WALK_DIRECTION_CHANGE", RELEASE, self.current_walking_key))
+            actions.append(Action("WALK_DIRECTION_CHANGE", PRESS, direction_key))
+            self.current_walking_key = direction_key
+            return "WALK_DIRECTION_CHANGE"
+        elif not should_walk and self.walking_key_pressed:
+            # Stop walking - release key
+            actions.append(Action("WALK_KEY_RELEASE", RELEASE, self.current_walking_key))
+            self.walking_key_pressed = False
+            self.current_walking_key = None
+            return "WALK_KEY_RELEASE"
+
+        return None  # No key state change needed
+
+    def release_walking(self):
+        """Release the walking key if it is held; returns the actions."""
+        if not self.walking_key_pressed:
+            return []
+        key = self.current_walking_key
+        self.walking_key_pressed = False
+        self.current_walking_key = None
+        return [Action("WALK_KEY_RELEASE", RELEASE, key)]
+
+    def release_jump(self):
+        """Release the jump key if it is held; returns the actions."""
+        if not self.jump_key_pressed:
+            return []
+        self.jump_key_pressed = False
+        return [Action("JUMP_END", RELEASE, self.keymap['jump'])]
+
+    def release_all(self):
+        """Release every key the engine believes is held (e.g. on shutdown or a stall)."""
+        return self.release_walking() + self.release_jump()
+
+    # --- Batch API ---
+
+    def run_batch(self, samples, times=None):
+        """Evaluate a whole recording from a fresh state.
+
+        `samples` is an (N, 4) array of x, y, z, gyro_y; `times` is an optional
+        (N,) array of seconds (defaults to SAMPLE_INTERVAL_S spacing). Gives
+        the same actions as calling step() on each sample in turn (up to
+        floating-point rounding of the magnitude average when
+        MAGNITUDE_WINDOW > 1).
+        """
+        import numpy as np
+
+        self.reset()
+        data = np.asarray(samples, dtype=np.float64)
+        n = len(data)
+        if n == 0:
+            empty = np.empty(0)
+            return BatchResult(empty, empty.astype(np.int8), empty.astype(np.int8), empty, [])
+        x, y, z, gyro = data[:, 0], data[:, 1], data[:, 2], data[:, 3]
+        if times is None:
+            times = np.arange(n) * SAMPLE_INTERVAL_S
+        else:
+            times = np.asarray(times, dtype=np.float64)
+
+        # Magnitude (moving average over the magnitude window) and jerk
+        magnitude = np.sqrt(x * x + y * y + z * z)
+        if self.magnitude_window is not None:
+            size = self.magnitude_window.size
+            cumulative = np.concatenate(([0.0], np.cumsum(magnitude)))
+            start = np.maximum(np.arange(1, n + 1) - size, 0)
+            magnitude = (cumulative[1:] - cumulative[start]) / (np.arange(1, n + 1) - start)
+        jerk = magnitude - GRAVITY_CONSTANT
+
+        # Walking swing: peak |z| over the swing window (zero padding never wins a max)
+        swing = np.abs(z)
+        if self.swing_window is not None:
+            size = self.swing_window.size
+            padded = np.concatenate((np.zeros(size - 1), swing))
+            swing = np.lib.stride_tricks.sliding_window_view(padded, size).max(axis=1)
+
+        # Raw states (COMBAT takes priority over WALKING, as in determine_state_from_sensors)
+        raw = np.zeros(n, dtype=np.int8)
+        raw[np.abs(x) > GRAVITY_THRESHOLD] = 1
+        raw[np.abs(y) > GRAVITY_THRESHOLD] = 2
+
+        # Stability buffer: rolling per-state counts over the last buffer_size samples
+        onehot = np.zeros((n + 1, 3), dtype=np.int32)
+        onehot[np.arange(1, n + 1), raw] = 1
+        cumulative = np.cumsum(onehot, axis=0)
+        start = np.maximum(np.arange(1, n + 1) - self.buffer_size, 0)
+        counts = cumulative[1:] - cumulative[start]
+        has = counts >= self.consensus
+        stable = np.where(has[:, 1], 1, np.where(has[:, 2], 2, np.where(has[:, 0], 0, -1)))
+        # No consensus keeps the previous stable state (forward fill, starting at IDLE)
+        last_idx = np.maximum.accumulate(np.where(stable >= 0, np.arange(n), -1))
+        states = np.where(last_idx >= 0, stable[np.maximum(last_idx, 0)], 0).astype(np.int8)
+
+        # Relative rotation integration
+        effective = gyro - gyro[0]
+        dt = np.empty(n)
+        dt[0] = 0.0
+        dt[1:] = np.diff(times)
+        rotation = np.cumsum(np.where(np.abs(effective) > self.walk_gyro_noise_limit,
+                                      effective * dt, 0.0))
+
+        # Stateful part: cooldown, held keys
+        actions = []
+        act = self.act
+        z_list = z.tolist()
+        jerk_list = jerk.tolist()
+        x_list = x.tolist()
+        y_list = y.tolist()
+        swing_list = swing.tolist()
+        onset = self.onset
+        for i, (state, rot, t) in enumerate(zip(states.tolist(), rotation.tolist(), times.tolist())):
+            if onset is not None:
+                onset.push(jerk_list[i])
+            self.current_state = STATES[state]
+            self.total_rotation = rot
+            self.swing = swing_list[i]
+            fired = act(x_list[i], y_list[i], z_list[i], jerk_list[i], t)
+            for action in fired:
+                actions.append((i, action))
+
+        # Leave the engine as if every sample had been stepped
+        self.initial_gyro_heading = float(gyro[0])
+        self.last_time = float(times[-1])
+        self.state_buffer.extend(STATES[s] for s in raw[-self.buffer_size:].tolist())
+        if self.magnitude_window is not None:
+            for m in np.sqrt(x * x + y * y + z * z)[-self.magnitude_window.size:].tolist():
+                self.magnitude_window.push(m)
+        if self.swing_window is not None:
+            for value in np.abs(z[-self.swing_window.size:]).tolist():
+                self.swing_window.push(value)
+        return BatchResult(jerk, raw, states, rotation, actions)
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Storage and loading of recorded gesture clips in gesture_data/.
+
+Two formats are supported:
+
+- `<action>_data.json`: the original pretty-printed list of clips, each a
+  list of {timestamp_ms, accel_x, accel_y, accel_z, gyro_y} dicts
+- `<action>.gcol`: columnar binary file that loads through numpy.memmap
+  with no parsing
+
+`.gcol` layout (little-endian, every column 64-byte aligned):
+
+    magic "GCOL" | version u16 | reserved u16 | header_len u32
+    JSON metadata header (action, counts, column offsets, ...)
+    timestamp_ns   int64[N]    host monotonic clock
+    accel_x        float32[N]
+    accel_y        float32[N]
+    accel_z        float32[N]
+    gyro_y         float32[N]
+    clip_offsets   int64[C+1]  clip i is rows clip_offsets[i]:clip_offsets[i+1]
+
+Usage:
+    python3 gesture_store.py convert gesture_data/*_data.json
+    python3 gesture_store.py info gesture_data/punch.gcol
+    python3 gesture_store.py export gesture_data/punch.gcol   # back to JSON
+"""
+
+import argparse
+import glob
+import json
+import os
+import struct
+import sys
+import time
+
+DATA_DIR = "gesture_data"
+GCOL_MAGIC = b"GCOL"
+GCOL_VERSION = 1
+GCOL_PREAMBLE = struct.Struct("<4sHHI")
+ALIGNMENT = 64
+SAMPLE_INTERVAL_NS = 30_000_000  # Android send interval, used when timestamps are unusable
+
+# Column name -> numpy dtype string, in file order
+SAMPLE_COLUMNS = (
+    ("timestamp_ns", "<i8"),
+    ("accel_x", "<f4"),
+    ("accel_y", "<f4"),
+    ("accel_z", "<f4"),
+    ("gyro_y", "<f4"),
+)
+AXES = ("accel_x", "accel_y", "accel_z", "gyro_y")
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_recording(path, columns, clip_offsets, metadata=None):
+    """Write a .gcol file.
+
+    `columns` maps every name in SAMPLE_COLUMNS to a sequence of equal length
+    N; `clip_offsets` is a sequence of C+1 row indices starting at 0 and
+    ending at N.
+    """
+    import numpy as np
+
+    arrays = [(name, np.ascontiguousarray(columns[name], dtype=dtype))
+              for name, dtype in SAMPLE_COLUMNS]
+    n = len(arrays[0][1])
+    if any(len(a) != n for _, a in arrays):
+        raise ValueError("All sample columns must have the same length")
+    offsets = np.ascontiguousarray(clip_offsets, dtype="<i8")
+    if len(offsets) < 1 or offsets[0] != 0 or offsets[-1] != n:
+        raise ValueError("clip_offsets must start at 0 and end at the sample count")
+    arrays.append(("clip_offsets", offsets))
+
+    # Header size depends on the offsets it contains; lay out until it is stable
+    meta = dict(metadata or {})
+    meta.update({"samples": int(n), "clips": int(len(offsets) - 1)})
+    header_len = 0
+    while True:
+        layout = {}
+        position = _align(GCOL_PREAMBLE.size + header_len)
+        for name, array in arrays:
+            layout[name] = {"dtype": array.dtype.str, "offset": position, "count": int(len(array))}
+            position = _align(position + array.nbytes)
+        meta["columns"] = layout
+        header = json.dumps(meta, sort_keys=True).encode()
+        if len(header) <= header_len:
+            break
+        header_len = len(header) + 64  # Leave room so the next pass converges
+
+    with open(path, 'wb') as f:
+        f.write(GCOL_PREAMBLE.pack(GCOL_MAGIC, GCOL_VERSION, 0, header_len))
+        f.write(header.ljust(header_len))
+        for name, array in arrays:
+            f.seek(layout[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(position)
+
+
+class GestureRecording:
+    """Memory-mapped view of a .gcol file. Columns are numpy.memmap arrays."""
+
+    def __init__(self, path):
+        import numpy as np
+
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, version, _, header_len = GCOL_PREAMBLE.unpack(f.read(GCOL_PREAMBLE.size))
+            if magic != GCOL_MAGIC:
+                raise ValueError(f"{path} is not a .gcol recording")
+            if version != GCOL_VERSION:
+                raise ValueError(f"Unsupported .gcol version {version}")
+            self.metadata = json.loads(f.read(header_len))
+
+        self.columns = {}
+        for name, spec in self.metadata["columns"].items():
+            if spec["count"] == 0:
+                self.columns[name] = np.empty(0, dtype=spec["dtype"])
+            else:
+                self.columns[name] = np.memmap(path, dtype=spec["dtype"], mode='r',
+                                               offset=spec["offset"], shape=(spec["count"],))
+        self.clip_offsets = self.columns.pop("clip_offsets")
+
+    def __len__(self):
+        return self.metadata["samples"]
+
+    @property
+    def action(self):
+        return self.metadata.get("action")
+
+    @property
+    def num_clips(self):
+        return len(self.clip_offsets) - 1
+
+    def samples(self, start=0, stop=None):
+        """(N, 4) float64 array of x, y, z, gyro_y for rows start:stop."""
+        import numpy as np
+
+        stop = len(self) if stop is None else stop
+        return np.stack([self.columns[axis][start:stop] for axis in AXES], axis=1).astype(np.float64)
+
+    def timestamps_s(self, start=0, stop=None):
+        """Timestamps for rows start:stop in seconds, relative to the first row."""
+        ts = self.columns["timestamp_ns"][start:stop]
+        return (ts - ts[0]) / 1e9 if len(ts) else ts.astype(float)
+
+    def clip(self, index):
+        """(n, 4) float64 array for one clip."""
+        return self.samples(int(self.clip_offsets[index]), int(self.clip_offsets[index + 1]))
+
+    def clips(self):
+        return [self.clip(i) for i in range(self.num_clips)]
+
+
+def open_recording(path):
+    return GestureRecording(path)
+
+
+def convert_json(json_path, out_path=None):
+    """Convert a calibrate.py JSON file to .gcol; returns the output path.
+
+    The recorded timestamp_ms values were derived from wall-clock deltas and
+    often repeat; if a clip's timestamps are not strictly increasing they are
+    replaced by the nominal 30 ms send interval and the header says so.
+    """
+    action = os.path.basename(json_path)
+    action = action[:-len("_data.json")] if action.endswith("_data.json") else os.path.splitext(action)[0]
+    if out_path is None:
+        out_path = os.path.join(os.path.dirname(json_path), f"{action}.gcol")
+
+    with open(json_path) as f:
+        clips = json.load(f)
+
+    columns = {name: [] for name, _ in SAMPLE_COLUMNS}
+    clip_offsets = [0]
+    synthesized = 0
+    base_ns = 0
+    for clip in clips:
+        stamps = [int(r.get("timestamp_ms", 0)) * 1_000_000 for r in clip]
+        if any(b <= a for a, b in zip(stamps, stamps[1:])):
+            stamps = [i * SAMPLE_INTERVAL_NS for i in range(len(clip))]
+            synthesized += 1
+        for stamp, reading in zip(stamps, clip):
+            columns["timestamp_ns"].append(base_ns + stamp)
+            for axis in AXES:
+                columns[axis].append(reading[axis])
+        if stamps:
+            # Keep the combined timestamp column monotonic across clips
+            base_ns += stamps[-1] + SAMPLE_INTERVAL_NS
+        clip_offsets.append(len(columns["timestamp_ns"]))
+
+    write_recording(out_path, columns, clip_offsets, {
+        "action": action,
+        "source": os.path.basename(json_path),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "timestamp_clock": "monotonic_ns",
+        "synthesized_timestamp_clips": synthesized,
+    })
+    return out_path
+
+
+def export_json(gcol_path, out_path=None):
+    """Write a .gcol recording back out in the calibrate.py JSON layout."""
+    recording = open_recording(gcol_path)
+    if out_path is None:
+        out_path = os.path.join(os.path.dirname(gcol_path), f"{recording.action}_data.json")
+    clips = []
+    ts = recording.columns["timestamp_ns"]
+    for i in range(recording.num_clips):
+        start, stop = int(recording.clip_offsets[i]), int(recording.clip_offsets[i + 1])
+        clips.append([{
+            "timestamp_ms": int((ts[row] - ts[start]) // 1_000_000),
+            **{axis: round(float(recording.columns[axis][row]), 3) for axis in AXES},
+        } for row in range(start, stop)])
+    with open(out_path, 'w') as f:
+        json.dump(clips, f, indent=2)
+    return out_path
+
+
+def _find_recordings(data_dir):
+    """{action: path}, preferring .gcol over JSON when both exist."""
+    found = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, "*_data.json"))):
+        found[os.path.basename(path)[:-len("_data.json")]] = path
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.gcol"))):
+        found[os.path.splitext(os.path.basename(path))[0]] = path
+    return found
+
+
+def load_clip_arrays(data_dir=DATA_DIR):
+    """Return {action_name: [(n, 4) float64 array, ...]}."""
+    import numpy as np
+
+    arrays = {}
+    for action, path in _find_recordings(data_dir).items():
+        if path.endswith(".gcol"):
+            arrays[action] = open_recording(path).clips()
+        else:
+            arrays[action] = [np.asarray(clip, dtype=np.float64).reshape(-1, 4)
+                              for clip in _load_json_clips(path)]
+    return arrays
+
+
+def _load_json_clips(path):
+    with open(path) as f:
+        clips = json.load(f)
+    return [[(r["accel_x"], r["accel_y"], r["accel_z"], r["gyro_y"]) for r in clip]
+            for clip in clips]
+
+
+def load_traces(data_dir=DATA_DIR):
+    """Return {action_name: [clip, ...]} where each clip is a list of (x, y, z, gyro_y)."""
+    traces = {}
+    for action, path in _find_recordings(data_dir).items():
+        if path.endswith(".gcol"):
+            traces[action] = [[tuple(row) for row in clip.tolist()]
+                              for clip in open_recording(path).clips()]
+        else:
+            traces[action] = _load_json_clips(path)
+    return traces
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert and inspect gesture recordings")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="Convert calibrate.py JSON files to .gcol")
+    convert.add_argument("paths", nargs="+")
+    info = sub.add_parser("info", help="Show the header of .gcol files")
+    info.add_argument("paths", nargs="+")
+    export = sub.add_parser("export", help="Write .gcol files back out as JSON")
+    export.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        if args.command == "convert":
+            out_path = convert_json(path)
+            print(f"💾 {path} ({os.path.getsize(path):,} bytes) -> "
+                  f"{out_path} ({os.path.getsize(out_path):,} bytes)")
+        elif args.command == "export":
+            print(f"💾 {path} -> {export_json(path)}")
+        else:
+            recording = open_recording(path)
+            meta = {k: v for k, v in recording.metadata.items() if k != "columns"}
+            print(f"{path}: {json.dumps(meta)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Key output backends for the motion controller.
+
+The engine emits key names ("right", "left", "z", "space", ...) and the
+KeyInjectionWorker hands them to a backend. Every backend has the same small
+interface:
+
+    press(name) / release(name)   queue or inject one key event
+    sync()                        end of one processed packet's events
+    close()                       release resources
+
+Backends are created with create_backend(name); each imports its
+dependencies only when it is created, so headless and benchmark runs never
+load pynput or open a display connection.
+
+- pynput:  the desktop keyboard via pynput (X11, Windows, macOS)
+- uinput:  a virtual keyboard on Linux /dev/uinput. Events are buffered
+           and written with one SYN_REPORT per sync(), i.e. one write()
+           per processed packet
+- record:  keeps every event with its timestamp (tests and replay)
+- null:    counts events and does nothing else
+
+Usage:
+    python3 key_backends.py bench [--backend null record pynput] [--events 20000]
+"""
+
+import argparse
+import json
+import os
+import struct
+import subprocess
+import sys
+import time
+
+BACKENDS = ("pynput", "uinput", "record", "null")
+DEFAULT_BACKEND = "pynput"
+
+
+class NullBackend:
+    """Counts events; nothing is injected."""
+
+    def __init__(self):
+        self.presses = 0
+        self.releases = 0
+        self.syncs = 0
+
+    def press(self, name):
+        self.presses += 1
+
+    def release(self, name):
+        self.releases += 1
+
+    def sync(self):
+        self.syncs += 1
+
+    def close(self):
+        pass
+
+
+class RecordingBackend:
+    """Keeps (monotonic_ns, "press"/"release"/"sync", name) for every event.
+
+    With a path, the events are written as JSON lines on close().
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.events = []
+
+    def press(self, name):
+        self.events.append((time.monotonic_ns(), "press", name))
+
+    def release(self, name):
+        self.events.append((time.monotonic_ns(), "release", name))
+
+    def sync(self):
+        self.events.append((time.monotonic_ns(), "sync", None))
+
+    def keys_down(self):
+        """Keys pressed and not yet released, in press order."""
+        down = []
+        for _, kind, name in self.events:
+            if kind == "press" and name not in down:
+                down.append(name)
+            elif kind == "release" and name in down:
+                down.remove(name)
+        return down
+
+    def close(self):
+        if self.path is None:
+            return
+        with open(self.path, 'w') as f:
+            for t_ns, kind, name in self.events:
+                f.write(json.dumps({"t_ns": t_ns, "event": kind, "key": name}) + "\n")
+
+
+class PynputBackend:
+    """Injects through pynput's keyboard Controller (imported on creation)."""
+
+    def __init__(self):
+        from pynput.keyboard import Controller, Key
+
+        self._key = Key
+        self._keyboard = Controller()
+        self._resolved = {}
+
+    def _resolve(self, name):
+        key = self._resolved.get(name)
+        if key is None:
+            key = name if len(name) == 1 else self._key[name]
+            self._resolved[name] = key
+        return key
+
+    def press(self, name):
+        self._keyboard.press(self._resolve(name))
+
+    def release(self, name):
+        self._keyboard.release(self._resolve(name))
+
+    def sync(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# --- Linux uinput ---
+
+EV_SYN = 0x00
+EV_KEY = 0x01
+SYN_REPORT = 0
+UI_DEV_CREATE = 0x5501
+UI_DEV_DESTROY = 0x5502
+UI_SET_EVBIT = 0x40045564
+UI_SET_KEYBIT = 0x40045565
+BUS_VIRTUAL = 0x06
+INPUT_EVENT = struct.Struct("llHHi")  # struct input_event (timeval, type, code, value)
+UINPUT_USER_DEV = struct.Struct("80sHHHHi256i")  # legacy struct uinput_user_dev
+
+# Linux input-event-codes.h
+UINPUT_KEYS = {
+    **dict(zip("1234567890", range(2, 12))),
+    **dict(zip("qwertyuiop", range(16, 26))),
+    **dict(zip("asdfghjkl", range(30, 39))),
+    **dict(zip("zxcvbnm", range(44, 51))),
+    "esc": 1, "backspace": 14, "tab": 15, "enter": 28, "ctrl": 29, "ctrl_l": 29,
+    "shift": 42, "shift_l": 42, "shift_r": 54, "alt": 56, "alt_l": 56, "space": 57,
+    "up": 103, "left": 105, "right": 106, "down": 108,
+}
+
+
+class UinputBackend:
+    """Virtual keyboard on /dev/uinput.
+
+    press()/release() only append to a buffer; sync() terminates the batch
+    with a single SYN_REPORT and writes it in one write() call. A key that
+    changes twice in one batch (a tap) gets a SYN_REPORT in between, since
+    readers treat each report as one simultaneous state change.
+
+    Needs write access to /dev/uinput (root, or the `input`/`uinput` group).
+    """
+
+    def __init__(self, path="/dev/uinput", name="silksong-motion-controller", keys=None):
+        import fcntl
+
+        self._fcntl = fcntl
+        self._fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            fcntl.ioctl(self._fd, UI_SET_EVBIT, EV_KEY)
+            for code in sorted(set((keys or UINPUT_KEYS).values())):
+                fcntl.ioctl(self._fd, UI_SET_KEYBIT, code)
+            os.write(self._fd, UINPUT_USER_DEV.pack(name.encode()[:79], BUS_VIRTUAL,
+                                                    0x1209, 0x5350, 1, 0, *([0] * 256)))
+            fcntl.ioctl(self._fd, UI_DEV_CREATE)
+        except OSError:
+            os.close(self._fd)
+            raise
+        self._buffer = bytearray()
+        self._touched = set()
+        self.writes = 0
+
+    def _event(self, code, value):
+        if code in self._touched:
+            self._buffer += INPUT_EVENT.pack(0, 0, EV_SYN, SYN_REPORT, 0)
+            self._touched.clear()
+        self._touched.add(code)
+        self._buffer += INPUT_EVENT.pack(0, 0, EV_KEY, code, value)
+
+    def press(self, name):
+        self._event(UINPUT_KEYS[name], 1)
+
+    def release(self, name):
+        self._event(UINPUT_KEYS[name], 0)
+
+    def sync(self):
+        if not self._buffer:
+            return
+        self._buffer += INPUT_EVENT.pack(0, 0, EV_SYN, SYN_REPORT, 0)
+        os.write(self._fd, self._buffer)
+        self.writes += 1
+        self._buffer.clear()
+        self._touched.clear()
+
+    def close(self):
+        if self._fd is None:
+            return
+        self.sync()
+        self._fcntl.ioctl(self._fd, UI_DEV_DESTROY)
+        os.close(self._fd)
+        self._fd = None
+
+
+def create_backend(name, **options):
+    """Create a backend by name ("pynput", "uinput", "record" or "null")."""
+    if name == "pynput":
+        return PynputBackend()
+    if name == "uinput":
+        return UinputBackend(**options)
+    if name == "record":
+        return RecordingBackend(**options)
+    if name == "null":
+        return NullBackend()
+    raise ValueError(f"Unknown key backend {name!r} (choose from {', '.join(BACKENDS)})")
+
+
+# --- Benchmark ---
+
+def measure_startup(name):
+    """Seconds to create the backend (including its imports) in a fresh interpreter."""
+    code = ("import time, key_backends; t = time.perf_counter(); "
+            f"key_backends.create_backend({name!r}); print(time.perf_counter() - t)")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout)
+
+
+def measure_events(backend, events, keys=("right", "z", "x")):
+    """Mean ns per key event for press/release pairs with one sync per pair."""
+    start = time.perf_counter_ns()
+    for i in range(events // 2):
+        key = keys[i % len(keys)]
+        backend.press(key)
+        backend.release(key)
+        backend.sync()
+    return (time.perf_counter_ns() - start) / (events // 2 * 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Key output backends")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("bench", help="Measure startup time and per-event cost per backend")
+    bench.add_argument("--backend", nargs="+", choices=BACKENDS, default=["null", "record"],
+                       help="Backends to measure (pynput and uinput press real keys)")
+    bench.add_argument("--events", type=int, default=20_000)
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'backend':<8} {'startup ms':>11} {'ns/event':>10}")
+    for name in args.backend:
+        try:
+            startup = measure_startup(name)
+            backend = create_backend(name)
+        except (ImportError, OSError, RuntimeError) as e:
+            print(f"{name:<8} ❌ unavailable: {e}")
+            continue
+        try:
+            per_event = measure_events(backend, args.events)
+        finally:
+            backend.close()
+        results[name] = {"startup_ms": round(startup * 1e3, 2), "ns_per_event": round(per_event)}
+        print(f"{name:<8} {startup * 1e3:>11.2f} {per_event:>10.0f}")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Watchdog that releases held keys when the sensor stream stalls.
+
+Walking and jump keys are held until a later packet tells the engine to
+release them. If the phone locks or Wi-Fi drops, no such packet arrives and
+the receive loop sits in recvfrom() with the keys still down.
+
+KeyHoldWatchdog runs on its own thread next to the receive loop. It reads
+counters the loop already maintains (StatusSnapshot.packets) and the
+engine's held-key flags; the only per-packet cost is taking the shared
+`lock` around the engine's action stage.
+"""
+
+import threading
+import time
+
+
+class KeyHoldWatchdog:
+    """Releases every held key after `silence_timeout` seconds without packets,
+    and any key held longer than its max hold time.
+
+    A stall is reported once; the watchdog re-arms as soon as packets flow
+    again. A max hold of 0 disables that limit (walking is unlimited by
+    default since walking for a long time is normal).
+
+    Releases go through the engine's release_*() methods so its held-key
+    flags stay in sync. The engine is not thread-safe: the receive loop must
+    hold `lock` while it runs engine.act() and submits the resulting
+    actions, and the watchdog holds it while it reads the flags and submits
+    releases, so both see whole key state changes and queue them in order.
+    """
+
+    def __init__(self, engine, key_output, snapshot, silence_timeout=0.5,
+                 max_jump_hold=2.0, max_walk_hold=0.0, interval=None, log=print, lock=None):
+        self.engine = engine
+        self.lock = lock if lock is not None else threading.Lock()
+        self.key_output = key_output
+        self.snapshot = snapshot
+        self.silence_timeout = silence_timeout
+        self.max_jump_hold = max_jump_hold
+        self.max_walk_hold = max_walk_hold
+        # Tick often enough that keys are released within ~1.25x the timeout
+        limits = [t for t in (silence_timeout, max_jump_hold, max_walk_hold) if t > 0]
+        self.interval = interval if interval is not None else max(min(limits, default=1.0) / 4, 0.01)
+        self.log = log
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_packets = snapshot.packets
+        self._last_activity = time.monotonic()
+        self._stalled = False
+        self._jump_held_since = None
+        self._walk_held_since = None
+
+        self.stalls = 0
+        self.forced_releases = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="key-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self, now=None):
+        """One watchdog tick; exposed so replay tools can drive it directly."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            messages = self._check(now)
+        for message in messages:
+            self.log(message)
+
+    def _check(self, now):
+        """Watchdog tick with the engine lock held; returns the log messages."""
+        engine = self.engine
+        messages = []
+
+        packets = self.snapshot.packets
+        if packets != self._last_packets:
+            self._last_packets = packets
+            self._last_activity = now
+            if self._stalled:
+                self._stalled = False
+                messages.append("\n▶️ Stream resumed, watchdog re-armed")
+        elif (not self._stalled and self.silence_timeout > 0
+              and now - self._last_activity >= self.silence_timeout):
+            self._stalled = True
+            self.stalls += 1
+            released = self._release(engine.release_all())
+            messages.append(f"\n⏸️ Stream stalled for {now - self._last_activity:.2f} s, "
+                            f"released {released} held key(s)")
+
+        # Hold times are measured from when the watchdog first saw the key down
+        self._jump_held_since = self._held_since(engine.jump_key_pressed, self._jump_held_since, now)
+        self._walk_held_since = self._held_since(engine.walking_key_pressed, self._walk_held_since, now)
+        if self._exceeded(self._jump_held_since, self.max_jump_hold, now):
+            self._release(engine.release_jump())
+            self._jump_held_since = None
+            messages.append(f"\n⏱️ Jump key held longer than {self.max_jump_hold:.1f} s, released")
+        if self._exceeded(self._walk_held_since, self.max_walk_hold, now):
+            self._release(engine.release_walking())
+            self._walk_held_since = None
+            messages.append(f"\n⏱️ Walk key held longer than {self.max_walk_hold:.1f} s, released")
+        return messages
+
+    @staticmethod
+    def _held_since(pressed, since, now):
+        if not pressed:
+            return None
+        return now if since is None else since
+
+    @staticmethod
+    def _exceeded(since, limit, now):
+        return since is not None and limit > 0 and now - since >= limit
+
+    def _release(self, actions):
+        for action in actions:
+            self.key_output.submit(action.kind, action.key)
+        self.forced_releases += len(actions)
+        return len(actions)
+
+    def stats(self):
+        return {"stalls": self.stalls, "forced_releases": self.forced_releases}
@@ -0,0 +1,189 @@
+"""
+Asynchronous key-injection stage for the motion controller.
+
+The receive loop only enqueues typed key events; a worker thread drains the
+queue and calls the keyboard backend (see key_backends.py). A stall in the
+OS input layer then delays key injection but never blocks reading the socket.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, NamedTuple
+
+PRESS = "PRESS"
+RELEASE = "RELEASE"
+TAP = "TAP"  # press immediately followed by release (punch)
+
+
+class KeyEvent(NamedTuple):
+    """One queued key operation, stamped with its enqueue time."""
+    kind: str
+    key: Any
+    enqueued_ns: int
+
+
+class KeyInjectionWorker:
+    """Bounded queue of key events consumed by a single worker thread.
+
+    Redundant events are collapsed while they are still pending:
+    - a duplicate PRESS/RELEASE/TAP of the same key is merged into the
+      pending one
+    - a RELEASE followed by a PRESS of the same key cancels out (the key
+      just stays held)
+
+    When the queue is full, new PRESS and TAP events are dropped. RELEASE
+    events are always accepted so a key can never be left stuck down.
+    """
+
+    def __init__(self, keyboard, max_pending=64):
+        self.keyboard = keyboard
+        self._sync = getattr(keyboard, "sync", None)  # Called once per drained batch
+        self.max_pending = max_pending
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+        # Counters (read without the lock; they are only informational)
+        self.injected = 0
+        self.errors = 0  # Backend calls that raised; the worker keeps running
+        self.merged = 0
+        self.dropped = 0
+        self.latency_ns_total = 0
+        self.latency_ns_max = 0
+        self.histogram = None  # Optional metrics.LatencyHistogram of backend call times
+
+    # --- Producer side (called from the receive loop) ---
+
+    def press(self, key):
+        self.submit(PRESS, key)
+
+    def release(self, key):
+        self.submit(RELEASE, key)
+
+    def tap(self, key):
+        self.submit(TAP, key)
+
+    def submit(self, kind, key):
+        """Enqueue a key event without ever blocking on keyboard I/O."""
+        with self._cond:
+            self._enqueue(kind, key, time.perf_counter_ns())
+            self._cond.notify()
+
+    def submit_actions(self, actions):
+        """Enqueue all key actions of one packet under one lock, so the
+        worker injects them as one batch (one backend sync)."""
+        enqueued_ns = time.perf_counter_ns()
+        with self._cond:
+            for action in actions:
+                self._enqueue(action.kind, action.key, enqueued_ns)
+            self._cond.notify()
+
+    def _enqueue(self, kind, key, enqueued_ns):
+        last = self._last_pending_for(key)
+        if last is not None:
+            if last.kind == kind:
+                self.merged += 1
+                return
+            if last.kind == RELEASE and kind == PRESS:
+                self._pending.remove(last)
+                self.merged += 2
+                return
+
+        if len(self._pending) >= self.max_pending and kind != RELEASE:
+            self.dropped += 1
+            return
+
+        self._pending.append(KeyEvent(kind, key, enqueued_ns))
+
+    def _last_pending_for(self, key):
+        for event in reversed(self._pending):
+            if event.key == key:
+                return event
+        return None
+
+    # --- Consumer side ---
+
+    def start(self):
+        """Start the worker thread."""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="key-injection", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Inject whatever is still pending, then stop the worker thread."""
+        if self._thread is None:
+            return
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and self._running:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Take everything pending: events of one packet arrive together
+                batch = list(self._pending)
+                self._pending.clear()
+            for event in batch:
+                self._inject(event)
+            if self._sync is not None:
+                try:
+                    self._sync()
+                except Exception as e:
+                    self._backend_error(e)
+
+    def _inject(self, event):
+        # A backend error must not end the thread: every later key would be lost
+        try:
+            if self.histogram is not None:
+                start_ns = time.perf_counter_ns()
+                self._call_backend(event)
+                self.histogram.observe(time.perf_counter_ns() - start_ns)
+            else:
+                self._call_backend(event)
+        except Exception as e:
+            self._backend_error(e, event)
+            return
+
+        latency_ns = time.perf_counter_ns() - event.enqueued_ns
+        self.injected += 1
+        self.latency_ns_total += latency_ns
+        if latency_ns > self.latency_ns_max:
+            self.latency_ns_max = latency_ns
+
+    def _backend_error(self, error, event=None):
+        self.errors += 1
+        if self.errors == 1:  # Report the first one; the rest only count
+            where = f"{event.kind} {event.key!r}" if event is not None else "sync"
+            print(f"\n⚠️ Key backend error on {where}: {error!r}")
+
+    def _call_backend(self, event):
+        if event.kind == PRESS:
+            self.keyboard.press(event.key)
+        elif event.kind == RELEASE:
+            self.keyboard.release(event.key)
+        else:
+            self.keyboard.press(event.key)
+            self.keyboard.release(event.key)
+
+    def stats(self):
+        """Summary of queue activity and enqueue-to-injection latency."""
+        avg_ms = (self.latency_ns_total / self.injected / 1e6) if self.injected else 0.0
+        return {
+            "injected": self.injected,
+            "errors": self.errors,
+            "merged": self.merged,
+            "dropped": self.dropped,
+            "pending": len(self._pending),
+            "latency_avg_ms": round(avg_ms, 3),
+            "latency_max_ms": round(self.latency_ns_max / 1e6, 3),
+        }
@@ -0,0 +1,226 @@
+"""
+Hot-path instrumentation for the motion controller.
+
+StageMetrics keeps one fixed-size latency histogram per pipeline stage
+(decode, state, rotation, features, action, key injection, display). The
+listener only records into it from its instrumented loop (--metrics), so
+the default loops carry no timing code at all.
+
+The histograms can be read three ways:
+- Prometheus text format over HTTP (FastAPI/uvicorn, imported on demand)
+- a human-readable dump on SIGUSR1
+- StageMetrics.summary() for the exit JSON
+
+SamplingProfiler captures the receive thread's stack at a fixed rate while
+enabled and writes folded stacks (flamegraph.pl / speedscope format), so a
+flame graph can be taken from a running controller without restarting it.
+"""
+
+import bisect
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+STAGES = ("decode", "state", "rotation", "features", "action", "burst",
+          "key_injection", "display")
+
+# Bucket upper bounds in ns: 250 ns doubling up to ~1 s (23 buckets + overflow)
+BUCKET_BOUNDS_NS = tuple(250 << i for i in range(23))
+METRIC_PREFIX = "silksong_controller"
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; observe() is a bisect and two adds."""
+
+    __slots__ = ("counts", "sum_ns", "count", "max_ns")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+        self.sum_ns = 0
+        self.count = 0
+        self.max_ns = 0
+
+    def observe(self, ns):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_NS, ns)] += 1
+        self.sum_ns += ns
+        self.count += 1
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def quantile(self, q):
+        """Upper bound (ns) of the bucket holding the q-quantile."""
+        if not self.count:
+            return 0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS_NS, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max_ns
+
+
+class StageMetrics:
+    """One LatencyHistogram per stage plus optional extra gauges.
+
+    `gauges` is a callable returning {name: number}, evaluated only when
+    the metrics are exported (e.g. stream loss or key queue counters).
+    """
+
+    def __init__(self, stages=STAGES, gauges=None):
+        self.histograms = {stage: LatencyHistogram() for stage in stages}
+        self.gauges = gauges
+        self.started = time.time()
+
+    def observe(self, stage, ns):
+        self.histograms[stage].observe(ns)
+
+    def prometheus_text(self):
+        """Render all histograms and gauges in the Prometheus text exposition format."""
+        name = f"{METRIC_PREFIX}_stage_latency_seconds"
+        lines = [f"# HELP {name} Time spent in each listener pipeline stage.",
+                 f"# TYPE {name} histogram"]
+        for stage, hist in self.histograms.items():
+            cumulative = 0
+            for bound, count in zip(BUCKET_BOUNDS_NS, hist.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound / 1e9:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {hist.count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {hist.sum_ns / 1e9:.9f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {hist.count}')
+        if self.gauges is not None:
+            for key, value in self.gauges().items():
+                lines.append(f"# TYPE {METRIC_PREFIX}_{key} gauge")
+                lines.append(f"{METRIC_PREFIX}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """{stage: {count, avg_us, p50_us, p99_us, max_us}} for stages that saw data."""
+        result = {}
+        for stage, hist in self.histograms.items():
+            if not hist.count:
+                continue
+            result[stage] = {
+                "count": hist.count,
+                "avg_us": round(hist.sum_ns / hist.count / 1e3, 2),
+                "p50_us": round(hist.quantile(0.50) / 1e3, 2),
+                "p99_us": round(hist.quantile(0.99) / 1e3, 2),
+                "max_us": round(hist.max_ns / 1e3, 2),
+            }
+        return result
+
+    def dump(self, file=None):
+        """Print a per-stage latency table (p50/p99 are bucket upper bounds)."""
+        file = file or sys.stderr
+        print(f"\n📊 Stage latency after {time.time() - self.started:.0f} s:", file=file)
+        print(f"   {'stage':<14} {'count':>9} {'avg µs':>8} {'p50 µs':>8} {'p99 µs':>8} {'max µs':>9}",
+              file=file)
+        for stage, s in self.summary().items():
+            print(f"   {stage:<14} {s['count']:>9} {s['avg_us']:>8.2f} {s['p50_us']:>8.2f} "
+                  f"{s['p99_us']:>8.2f} {s['max_us']:>9.2f}", file=file)
+        file.flush()
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at `hz` while running.
+
+    Stacks are counted in folded form ("outer;inner;leaf count") and written
+    to `path` on stop(), ready for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, path="profile.folded", hz=500, thread_id=None):
+        self.path = path
+        self.interval = 1.0 / hz
+        self.thread_id = thread_id if thread_id is not None else threading.main_thread().ident
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.stacks.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and write the folded stacks; returns the number of samples."""
+        if self._thread is None:
+            return 0
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        with open(self.path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return sum(self.stacks.values())
+
+    def toggle(self):
+        """Start if stopped, otherwise stop and write; returns True if now running."""
+        if self.running:
+            samples = self.stop()
+            print(f"\n🔥 Profiler stopped: {samples} samples written to {self.path}")
+            return False
+        self.start()
+        print(f"\n🔥 Profiler started ({1 / self.interval:.0f} Hz)")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+
+def install_signal_handlers(metrics, profiler=None):
+    """SIGUSR1 dumps the histograms; SIGUSR2 toggles the profiler (POSIX only)."""
+    if not hasattr(signal, "SIGUSR1"):
+        return False
+    signal.signal(signal.SIGUSR1, lambda signum, frame: metrics.dump())
+    if profiler is not None:
+        signal.signal(signal.SIGUSR2, lambda signum, frame: profiler.toggle())
+    return True
+
+
+def start_http_server(metrics, host="127.0.0.1", port=9108, profiler=None):
+    """Serve /metrics (Prometheus) and POST /profile (profiler toggle) on a daemon thread."""
+    try:
+        import uvicorn
+        from fastapi import FastAPI
+        from fastapi.responses import PlainTextResponse
+    except ImportError:
+        raise RuntimeError("The metrics endpoint needs fastapi and uvicorn "
+                           "(pip install -r requirements.txt)") from None
+
+    app = FastAPI(title="Silksong controller metrics")
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def prometheus():
+        return metrics.prometheus_text()
+
+    @app.post("/profile")
+    def toggle_profile():
+        if profiler is None:
+            return {"running": False, "error": "profiler not enabled"}
+        return {"running": profiler.toggle(), "path": profiler.path}
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    # Signals belong to the listener's main thread, not the server thread
+    server.install_signal_handlers = lambda: None
+    thread = threading.Thread(target=server.run, name="metrics-http", daemon=True)
+    thread.start()
+    return server
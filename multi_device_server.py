@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Multi-device motion controller server.
+
+udp_listener.py mixes every packet it receives into one state machine. This
+server keeps one controller session per sender instead, so several players
+(or a phone plus a wearable) can share one host process without their
+stability buffers, forward headings or held keys interfering. Everything
+runs on a single asyncio event loop; there is no thread per device.
+
+A session is keyed by the device_id in binary frames when it is non-zero,
+otherwise by the source address. Sessions that stay silent for
+--idle-timeout seconds are closed and any keys they hold are released.
+
+Usage:
+    python3 multi_device_server.py --ports 12345 12346
+    python3 multi_device_server.py --keymaps keymaps.json --idle-timeout 10
+
+keymaps.json assigns keys per session; the first matching entry wins:
+
+    {
+      "device:2":            {"walk_right": "d", "walk_left": "a", "jump": "w", "attack": "f"},
+      "port:12346":          {"walk_right": "l", "walk_left": "j", "jump": "i", "attack": "k"},
+      "addr:192.168.1.23":   {"jump": "space"}
+    }
+
+Keys are given by name ("right", "space", "shift", or a single character)
+and resolved by the key backend chosen with --backend.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from gesture_engine import GestureEngine, load_profile
+from key_backends import BACKENDS, DEFAULT_BACKEND, create_backend
+from key_worker import KeyInjectionWorker
+from sensor_protocol import ProtocolError, decode_packet
+from stream_stats import StreamStats
+
+HOST_IP = '0.0.0.0'
+DEFAULT_PORTS = (12345,)
+DEFAULT_IDLE_TIMEOUT = 5.0  # Seconds of silence before a session is closed
+
+
+def session_key(sample, addr, by="auto"):
+    """Identify the session a sample belongs to.
+
+    by="device" always uses the device_id, by="source" the (ip, port) of
+    the sender; "auto" uses the device_id when the sender sets one.
+    """
+    if by == "device" or (by == "auto" and sample.device_id):
+        return ("device", sample.device_id)
+    return ("source", addr)
+
+
+def format_session_key(key):
+    kind, value = key
+    return f"device {value}" if kind == "device" else f"{value[0]}:{value[1]}"
+
+
+class DeviceSession:
+    """Controller state for one sender: its own engine, stream stats and keymap."""
+
+    __slots__ = ("key", "engine", "stream_stats", "local_port", "last_seen",
+                 "packets", "started")
+
+    def __init__(self, key, engine, local_port):
+        self.key = key
+        self.engine = engine
+        self.stream_stats = StreamStats()
+        self.local_port = local_port  # Port the first packet arrived on
+        self.last_seen = time.monotonic()
+        self.packets = 0
+        self.started = self.last_seen
+
+    def handle(self, sample, current_time, arrival_ns):
+        """Run one sample through this session's engine; returns its key actions."""
+        self.packets += 1
+        if sample.seq is not None:
+            if not self.stream_stats.accept(sample.seq, sample.timestamp_ns, arrival_ns):
+                return ()
+            sender_dt = self.stream_stats.sender_dt if sample.timestamp_ns is not None else None
+        else:
+            sender_dt = None
+        return self.engine.step(sample, current_time, sender_dt)
+
+    def summary(self):
+        return {
+            "session": format_session_key(self.key),
+            "port": self.local_port,
+            "packets": self.packets,
+            "duration_s": round(self.last_seen - self.started, 2),
+            "stream": self.stream_stats.summary(),
+        }
+
+
+class MultiDeviceServer:
+    """Routes samples from any number of listening ports to per-device sessions.
+
+    All sessions share one key output (there is only one OS keyboard); each
+    session's engine carries its own keymap.
+    """
+
+    def __init__(self, key_output, profile=None, action_cooldown=None, keymaps=None,
+                 default_keymap=None, by="auto", idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.key_output = key_output
+        self.profile = profile
+        self.action_cooldown = action_cooldown
+        self.keymaps = keymaps or {}  # "device:N" / "port:N" / "addr:IP" -> keymap
+        self.default_keymap = default_keymap
+        self.by = by
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self.closed = []  # Summaries of expired sessions
+        self.rejected = 0
+
+    def keymap_for(self, key, local_port):
+        kind, value = key
+        candidates = [f"device:{value}"] if kind == "device" else [f"addr:{value[0]}:{value[1]}",
+                                                                  f"addr:{value[0]}"]
+        candidates.append(f"port:{local_port}")
+        for name in candidates:
+            if name in self.keymaps:
+                return {**(self.default_keymap or {}), **self.keymaps[name]}
+        return self.default_keymap
+
+    def open_session(self, key, local_port):
+        engine = GestureEngine(self.profile, self.action_cooldown,
+                               keymap=self.keymap_for(key, local_port))
+        session = DeviceSession(key, engine, local_port)
+        self.sessions[key] = session
+        print(f"▶️ Session {format_session_key(key)} started on port {local_port} "
+              f"({len(self.sessions)} active)")
+        return session
+
+    def datagram_received(self, data, addr, local_port):
+        try:
+            sample = decode_packet(data)
+        except ProtocolError:
+            self.rejected += 1
+            return
+        key = session_key(sample, addr, self.by)
+        session = self.sessions.get(key)
+        if session is None:
+            session = self.open_session(key, local_port)
+        session.last_seen = time.monotonic()
+        actions = session.handle(sample, time.time(), time.monotonic_ns())
+        if actions:
+            self.key_output.submit_actions(actions)
+
+    def close_session(self, key, reason):
+        session = self.sessions.pop(key)
+        # A player who walks away must not leave a walk/jump key held down
+        for action in session.engine.release_all():
+            self.key_output.submit(action.kind, action.key)
+        self.closed.append(session.summary())
+        print(f"👋 Session {format_session_key(key)} closed ({reason}, "
+              f"{session.packets} packets)")
+
+    def expire_idle(self, now=None):
+        now = time.monotonic() if now is None else now
+        for key, session in list(self.sessions.items()):
+            if now - session.last_seen > self.idle_timeout:
+                self.close_session(key, "idle")
+
+    def close_all(self):
+        for key in list(self.sessions):
+            self.close_session(key, "shutdown")
+
+    async def serve(self, host, ports):
+        """Listen on every port until cancelled."""
+        loop = asyncio.get_running_loop()
+        transports = []
+        try:
+            for port in ports:
+                transport, _ = await loop.create_datagram_endpoint(
+                    lambda port=port: SensorDatagramProtocol(self, port),
+                    local_addr=(host, port))
+                transports.append(transport)
+                print(f"📡 Listening on {host}:{port}")
+            while True:
+                await asyncio.sleep(max(self.idle_timeout / 2, 0.1))
+                self.expire_idle()
+        finally:
+            for transport in transports:
+                transport.close()
+
+
+class SensorDatagramProtocol(asyncio.DatagramProtocol):
+    """Forwards datagrams from one listening port to the server."""
+
+    def __init__(self, server, local_port):
+        self.server = server
+        self.local_port = local_port
+
+    def datagram_received(self, data, addr):
+        self.server.datagram_received(data, addr, self.local_port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-device motion controller server")
+    parser.add_argument("--host", default=HOST_IP)
+    parser.add_argument("--ports", type=int, nargs="+", default=list(DEFAULT_PORTS),
+                        help="UDP ports to listen on (e.g. one per player)")
+    parser.add_argument("--session-by", choices=("auto", "device", "source"), default="auto",
+                        help="Key sessions by device_id, source address, or device_id when set")
+    parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help="Close sessions silent for this many seconds")
+    parser.add_argument("--keymaps", metavar="PATH", help="Per-session keymap JSON")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Load thresholds from a profile JSON (e.g. written by tune_thresholds.py)")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="Key output backend (null/record press nothing)")
+    parser.add_argument("--stats-json", metavar="PATH",
+                        help="Also write the per-session summary to this JSON file")
+    args = parser.parse_args()
+
+    profile = load_profile(args.profile) if args.profile else None
+    keymaps = {}
+    if args.keymaps:
+        with open(args.keymaps) as f:
+            keymaps = json.load(f)
+
+    try:
+        backend = create_backend(args.backend)
+    except (ImportError, OSError) as e:
+        print(f"❌ Key backend '{args.backend}' is unavailable: {e}")
+        return
+    key_output = KeyInjectionWorker(backend)
+    server = MultiDeviceServer(key_output, profile, keymaps=keymaps, by=args.session_by,
+                               idle_timeout=args.idle_timeout)
+
+    print("✅ Multi-device controller is running.")
+    key_output.start()
+    try:
+        asyncio.run(server.serve(args.host, args.ports))
+    except KeyboardInterrupt:
+        print()
+    finally:
+        server.close_all()
+        key_output.stop()
+        backend.close()
+
+    stats = key_output.stats()
+    print(f"⌨️  Keys injected: {stats['injected']} | merged: {stats['merged']} | "
+          f"dropped: {stats['dropped']}")
+    summary = {"sessions": server.closed, "rejected": server.rejected, "keys": stats}
+    print(json.dumps(summary))
+    if args.stats_json:
+        with open(args.stats_json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
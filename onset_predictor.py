@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Onset prediction for punch and jump.
+
+Without it, a punch or jump fires on the first sample whose jerk force
+crosses the threshold, which is usually a sample or two before the peak but
+always after the rise has been visible. OnsetPredictor watches the last few
+jerk values and fires as soon as the rising edge is predicted to cross the
+threshold within a short horizon:
+
+- the jerk has risen on every one of the last `window` samples,
+- the current jerk is at least `confidence` x threshold, and
+- the least-squares slope over the window, extrapolated `horizon` samples
+  ahead, reaches the threshold.
+
+`confidence` is the accuracy/latency trade-off: 1.0 only ever fires at the
+threshold (the normal behaviour), lower values fire earlier on the rise and
+risk firing on motions that stop short of the threshold. The engine enables
+the predictor with the ONSET_CONFIDENCE profile key (see gesture_engine.py).
+
+Usage:
+    python3 onset_predictor.py                       # sweep confidence on gesture_data/
+    python3 onset_predictor.py --confidence 0.5 0.7 --horizon 2 --profile calibration_profile.json
+"""
+
+import argparse
+import json
+
+DEFAULT_WINDOW = 3   # Samples in the slope fit / rising-edge check
+DEFAULT_HORIZON = 2  # Samples ahead the crossing may be predicted
+DEFAULT_CONFIDENCE_SWEEP = (1.0, 0.9, 0.8, 0.7, 0.6, 0.5)
+
+
+class OnsetPredictor:
+    """Rising-edge predictor over the last `window` jerk samples."""
+
+    __slots__ = ("window", "horizon", "confidence", "_values", "_weights", "_index", "_count",
+                 "jerk", "slope", "rising")
+
+    def __init__(self, confidence, window=DEFAULT_WINDOW, horizon=DEFAULT_HORIZON):
+        if window < 2:
+            raise ValueError("Onset window must be at least 2 samples")
+        if not 0 < confidence <= 1:
+            raise ValueError("Onset confidence must be in (0, 1]")
+        self.window = window
+        self.horizon = horizon
+        self.confidence = confidence
+        # Least-squares slope of equally spaced samples: sum(w_i * v_i), oldest first
+        mean = (window - 1) / 2
+        denominator = sum((i - mean) ** 2 for i in range(window))
+        self._weights = tuple((i - mean) / denominator for i in range(window))
+        self._values = [0.0] * window
+        self.reset()
+
+    def reset(self):
+        self._index = 0
+        self._count = 0
+        self.jerk = 0.0
+        self.slope = 0.0
+        self.rising = False
+
+    def push(self, jerk):
+        """Add the newest jerk sample and update slope / rising edge."""
+        values = self._values
+        window = self.window
+        index = self._index
+        values[index] = jerk
+        index += 1
+        self._index = 0 if index == window else index
+        if self._count < window:
+            self._count += 1
+        self.jerk = jerk
+        if self._count < window:
+            self.slope = 0.0
+            self.rising = False
+            return
+
+        # Oldest first: the ring starts at the next write position
+        start = self._index
+        previous = values[start]
+        slope = self._weights[0] * previous
+        rising = True
+        for i in range(1, window):
+            value = values[(start + i) % window]
+            slope += self._weights[i] * value
+            if value <= previous:
+                rising = False
+            previous = value
+        self.slope = slope
+        self.rising = rising
+
+    def will_cross(self, threshold):
+        """True if the newest sample crosses `threshold` or the rise is predicted to."""
+        jerk = self.jerk
+        if jerk > threshold:
+            return True
+        return (self.rising and jerk >= self.confidence * threshold
+                and jerk + self.slope * self.horizon > threshold)
+
+
+# --- Evaluation on gesture_data/ ---
+
+TRIGGERS = {"PUNCH", "JUMP_START"}
+
+
+def _triggers(engine, clip):
+    """Sample indices of punch / jump-start actions for one clip."""
+    engine.reset()
+    result = engine.run_batch(clip)
+    return [i for i, action in result.actions if action.name in TRIGGERS]
+
+
+def evaluate(clips_by_action, profile, confidences, window=DEFAULT_WINDOW,
+             horizon=DEFAULT_HORIZON, interval_s=None):
+    """Compare early triggers against the threshold-only detector per clip.
+
+    An early trigger is a hit when the threshold detector fires on the same
+    clip within `horizon` samples after it, otherwise a false trigger. The
+    latency gained is how many samples earlier each hit fired.
+    """
+    from gesture_engine import SAMPLE_INTERVAL_S, GestureEngine
+
+    interval_s = interval_s or SAMPLE_INTERVAL_S
+    baseline_engine = GestureEngine({**profile, 'ONSET_CONFIDENCE': 0})
+    baseline = {action: [_triggers(baseline_engine, clip) for clip in clips]
+                for action, clips in clips_by_action.items()}
+
+    results = []
+    for confidence in confidences:
+        engine = GestureEngine({**profile, 'ONSET_CONFIDENCE': confidence,
+                                'ONSET_WINDOW': window, 'ONSET_HORIZON': horizon})
+        triggers = hits = false = missed = 0
+        gained = []
+        for action, clips in clips_by_action.items():
+            for clip, reference in zip(clips, baseline[action]):
+                early = _triggers(engine, clip)
+                triggers += len(early)
+                unmatched = list(reference)
+                for index in early:
+                    match = next((r for r in unmatched if index <= r <= index + horizon), None)
+                    if match is None:
+                        false += 1
+                    else:
+                        unmatched.remove(match)
+                        hits += 1
+                        gained.append(match - index)
+                missed += len(unmatched)
+        reference_total = sum(len(r) for clips in baseline.values() for r in clips)
+        results.append({
+            "confidence": confidence,
+            "triggers": triggers,
+            "hits": hits,
+            "false_triggers": false,
+            "false_rate": round(false / triggers, 4) if triggers else 0.0,
+            "missed": missed,
+            "reference_triggers": reference_total,
+            "mean_gain_samples": round(sum(gained) / len(gained), 3) if gained else 0.0,
+            "mean_gain_ms": round(sum(gained) / len(gained) * interval_s * 1e3, 1) if gained else 0.0,
+        })
+    return results
+
+
+def main():
+    from gesture_engine import DEFAULT_PROFILE, load_profile
+    from gesture_store import DATA_DIR, load_clip_arrays
+
+    parser = argparse.ArgumentParser(description="Evaluate onset prediction on recorded gestures")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--profile", metavar="PATH", help="Thresholds to evaluate (profile JSON)")
+    parser.add_argument("--confidence", type=float, nargs="+", default=list(DEFAULT_CONFIDENCE_SWEEP))
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW)
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON)
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to JSON")
+    args = parser.parse_args()
+
+    profile = dict(DEFAULT_PROFILE)
+    if args.profile:
+        profile.update(load_profile(args.profile))
+    clips = load_clip_arrays(args.data_dir)
+    if not clips:
+        raise SystemExit(f"❌ No recordings found in {args.data_dir}")
+
+    results = evaluate(clips, profile, args.confidence, args.window, args.horizon)
+    print(f"🔮 Onset prediction on {sum(len(c) for c in clips.values())} clips "
+          f"(window {args.window}, horizon {args.horizon})")
+    print(f"{'confidence':>10} {'triggers':>9} {'hits':>5} {'false':>6} {'false %':>8} "
+          f"{'missed':>7} {'gain ms':>8}")
+    for r in results:
+        print(f"{r['confidence']:>10.2f} {r['triggers']:>9} {r['hits']:>5} {r['false_triggers']:>6} "
+              f"{r['false_rate'] * 100:>7.1f}% {r['missed']:>7} {r['mean_gain_ms']:>8.1f}")
+    print("Set ONSET_CONFIDENCE in the profile JSON to enable early triggering (0 = off).")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Fixed-size sliding windows with O(1) statistics per sample.
+
+RollingWindow keeps numeric samples in a ring buffer (array('d')) together
+with a running sum, sum of squares and monotonic deques for max/min, so
+mean/variance/peak over the last `size` samples never need a scan.
+CategoryWindow does the same for a small set of labels (e.g. controller
+states) with running per-label counts.
+
+    window = RollingWindow(5)
+    window.push(9.7)
+    window.mean, window.std, window.max, window.min
+"""
+
+import math
+from array import array
+from collections import deque
+
+RESYNC_SAMPLES = 4096  # Running sums are recomputed exactly about this often
+
+class RollingWindow:
+    """Last `size` numeric samples with running count/sum/sumsq/max/min.
+
+    Max/min tracking can be switched off for windows that only need the
+    mean or variance; the corresponding property then raises.
+    """
+
+    __slots__ = ("size", "_values", "_index", "count", "sum", "sumsq",
+                 "_pushed", "_resync_at", "_maxq", "_minq")
+
+    def __init__(self, size, track_max=True, track_min=True):
+        if size < 1:
+            raise ValueError("Window size must be at least 1")
+        self.size = size
+        self._values = array('d', bytes(8 * size))
+        self._maxq = deque() if track_max else None  # (push index, value), values decreasing
+        self._minq = deque() if track_min else None  # (push index, value), values increasing
+        self.clear()
+
+    def clear(self):
+        self._index = 0
+        self._pushed = 0
+        self._resync_at = RESYNC_SAMPLES
+        self.count = 0
+        self.sum = 0.0
+        self.sumsq = 0.0
+        if self._maxq is not None:
+            self._maxq.clear()
+        if self._minq is not None:
+            self._minq.clear()
+
+    def push(self, value):
+        """Add one sample, evicting the oldest once the window is full."""
+        values = self._values
+        index = self._index
+        size = self.size
+        if self.count == size:
+            old = values[index]
+            self.sum += value - old
+            self.sumsq += value * value - old * old
+        else:
+            self.count += 1
+            self.sum += value
+            self.sumsq += value * value
+        values[index] = value
+
+        # Monotonic deques: drop entries that can no longer be the max/min
+        pushed = self._pushed
+        maxq = self._maxq
+        if maxq is not None:
+            while maxq and maxq[-1][1] <= value:
+                maxq.pop()
+            maxq.append((pushed, value))
+            if maxq[0][0] <= pushed - size:
+                maxq.popleft()
+        minq = self._minq
+        if minq is not None:
+            while minq and minq[-1][1] >= value:
+                minq.pop()
+            minq.append((pushed, value))
+            if minq[0][0] <= pushed - size:
+                minq.popleft()
+        self._pushed = pushed + 1
+
+        index += 1
+        if index == size:
+            index = 0
+            if pushed >= self._resync_at:
+                # Re-sum at a lap boundary so floating-point drift cannot accumulate
+                self.sum = math.fsum(values)
+                self.sumsq = math.fsum([v * v for v in values])
+                self._resync_at = pushed + RESYNC_SAMPLES
+        self._index = index
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def full(self):
+        return self.count == self.size
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    @property
+    def variance(self):
+        if not self.count:
+            return 0.0
+        mean = self.sum / self.count
+        return max(self.sumsq / self.count - mean * mean, 0.0)
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def max(self):
+        if self._maxq is None:
+            raise AttributeError("Window was created with track_max=False")
+        return self._maxq[0][1] if self._maxq else 0.0
+
+    @property
+    def min(self):
+        if self._minq is None:
+            raise AttributeError("Window was created with track_min=False")
+        return self._minq[0][1] if self._minq else 0.0
+
+    @property
+    def newest(self):
+        return self._values[self._index - 1] if self.count else 0.0
+
+
+class CategoryWindow:
+    """Last `size` labels with a running count per label.
+
+    Supports the deque methods a stability buffer needs (append, count,
+    clear), so it can replace a deque(maxlen=size).
+    """
+
+    __slots__ = ("size", "_labels", "_index", "_length", "_counts")
+
+    def __init__(self, size, labels=()):
+        if size < 1:
+            raise ValueError("Window size must be at least 1")
+        self.size = size
+        self._labels = [None] * size
+        self._counts = dict.fromkeys(labels, 0)
+        self.clear()
+
+    def clear(self):
+        self._index = 0
+        self._length = 0
+        for label in self._counts:
+            self._counts[label] = 0
+
+    def append(self, label):
+        """Add one label; returns how many times it now occurs in the window."""
+        counts = self._counts
+        index = self._index
+        if self._length == self.size:
+            counts[self._labels[index]] -= 1
+        else:
+            self._length += 1
+        self._labels[index] = label
+        count = counts.get(label, 0) + 1
+        counts[label] = count
+        index += 1
+        self._index = 0 if index == self.size else index
+        return count
+
+    def extend(self, labels):
+        for label in labels:
+            self.append(label)
+
+    def count(self, label):
+        return self._counts.get(label, 0)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        """Labels from oldest to newest."""
+        start = self._index if self._length == self.size else 0
+        for i in range(self._length):
+            yield self._labels[(start + i) % self.size]
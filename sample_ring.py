@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Shared-memory ring buffer of decoded sensor samples.
+
+Only one process can bind the sensor port, so the listener publishes every
+sample it accepts into a multiprocessing.shared_memory ring, and any number
+of local readers (recorder, plotter, tuner, inspector) attach to it by name
+without touching the socket or slowing the listener down.
+
+Layout (little-endian):
+
+    header (64 bytes)   magic "SRNG" | version u16 | record_size u16 |
+                        capacity u32 | pad | write_seq u64 (offset 16) | reserved
+    records             capacity x RECORD, slot = ring_seq % capacity
+
+There is exactly one writer. It fills a slot, then stores write_seq (the
+number of records ever written) through an 8-byte-aligned
+memoryview.cast('Q'): one native store that readers never see half done,
+unlike struct.pack_into, which copies byte by byte. That store publishes
+the record. Readers never take a lock: they copy the records between their
+own position and write_seq, then re-read write_seq and drop any record the
+writer may have lapped while they were copying. The oldest
+slot is the one the writer fills next, so only the newest capacity - 1
+records are ever readable; a reader that falls further behind skips ahead
+and counts the skipped records as overruns.
+
+Usage:
+    python3 udp_listener.py --shm silksong          # publish
+    python3 sample_ring.py tail silksong            # print samples as they arrive
+    python3 sample_ring.py stats silksong           # rate / overruns for a few seconds
+"""
+
+import argparse
+import struct
+import time
+from multiprocessing import shared_memory
+
+from sensor_protocol import SensorSample
+
+RING_MAGIC = b"SRNG"
+RING_VERSION = 2
+HEADER = struct.Struct("<4sHHI4xQ")  # magic, version, record_size, capacity, write_seq
+HEADER_SIZE = 64
+WRITE_SEQ_OFFSET = 16  # 8-byte aligned, so the cast view stores it in one write
+# ring_seq, arrival_ns (host monotonic), timestamp_ns (sender), seq, device_id, flags, x, y, z, gyro_y
+RECORD = struct.Struct("<QqqIHH4f")  # 48 bytes
+DEFAULT_CAPACITY = 1 << 14  # ~8 minutes at 33 Hz, 16 s at 1 kHz
+HAS_SEQ = 1
+HAS_TIMESTAMP = 2
+NUMPY_DTYPE = [("ring_seq", "<u8"), ("arrival_ns", "<i8"), ("timestamp_ns", "<i8"),
+               ("seq", "<u4"), ("device_id", "<u2"), ("flags", "<u2"),
+               ("x", "<f4"), ("y", "<f4"), ("z", "<f4"), ("gyro_y", "<f4")]
+
+
+class SampleRingWriter:
+    """Creates the ring and publishes samples; single writer only."""
+
+    def __init__(self, name, capacity=DEFAULT_CAPACITY):
+        if capacity < 2:
+            raise ValueError("Ring capacity must be at least 2")
+        self.capacity = capacity
+        self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                              size=HEADER_SIZE + capacity * RECORD.size)
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+        HEADER.pack_into(self.buf, 0, RING_MAGIC, RING_VERSION, RECORD.size, capacity, 0)
+        self._write_seq = _write_seq_view(self.buf)
+        self.write_seq = 0
+
+    def publish(self, sample, arrival_ns=None):
+        """Append one SensorSample; costs one record pack and one 8-byte store."""
+        ring_seq = self.write_seq
+        flags = 0
+        seq = sample.seq
+        if seq is None:
+            seq = 0
+        else:
+            flags = HAS_SEQ
+        timestamp_ns = sample.timestamp_ns
+        if timestamp_ns is None:
+            timestamp_ns = 0
+        else:
+            flags |= HAS_TIMESTAMP
+        RECORD.pack_into(self.buf, HEADER_SIZE + (ring_seq % self.capacity) * RECORD.size,
+                         ring_seq, time.monotonic_ns() if arrival_ns is None else arrival_ns,
+                         timestamp_ns, seq, sample.device_id, flags,
+                         sample.x, sample.y, sample.z, sample.gyro_y)
+        ring_seq += 1
+        self._write_seq[0] = ring_seq  # Publish
+        self.write_seq = ring_seq
+
+    def close(self):
+        """Detach and remove the ring (readers keep their mapping until they close)."""
+        self._write_seq.release()
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _write_seq_view(buf):
+    """write_seq as a native uint64 element; the segment is page aligned."""
+    return buf[WRITE_SEQ_OFFSET:WRITE_SEQ_OFFSET + 8].cast('Q')
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        # Before 3.13 every attach is tracked and unlinked when this process
+        # exits, which would delete the listener's ring
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class SampleRingReader:
+    """Attaches to an existing ring and reads the samples published since the
+    last call. Starts at the newest record unless from_start is set."""
+
+    def __init__(self, name, from_start=False):
+        self.shm = _attach(name)
+        self.buf = self.shm.buf
+        magic, version, record_size, capacity, write_seq = HEADER.unpack_from(self.buf, 0)
+        if magic != RING_MAGIC or version != RING_VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"Shared memory {name!r} is not a sample ring")
+        self._write_seq = _write_seq_view(self.buf)
+        self.capacity = capacity
+        self.window = capacity - 1  # The oldest slot may be mid-write
+        self.position = max(write_seq - self.window, 0) if from_start else write_seq
+        self.overruns = 0
+
+    def write_seq(self):
+        return self._write_seq[0]
+
+    def _span(self, max_records):
+        """[start, end) of readable ring sequence numbers, skipping lapped records."""
+        end = self.write_seq()
+        start = self.position
+        if end <= start:
+            return start, start  # Never move the reader backwards
+        if end - start > self.window:
+            self.overruns += end - self.window - start
+            start = end - self.window
+        if max_records is not None:
+            end = min(end, start + max_records)
+        return start, end
+
+    def _validate(self, start, end):
+        """First sequence number in [start, end) that the writer has not lapped since."""
+        oldest_intact = self.write_seq() - self.window
+        if oldest_intact > start:
+            self.overruns += min(oldest_intact, end) - start
+            return min(oldest_intact, end)
+        return start
+
+    def read_raw(self, max_records=None):
+        """New records as tuples in RECORD field order."""
+        start, end = self._span(max_records)
+        buf = self.buf
+        capacity = self.capacity
+        size = RECORD.size
+        records = [RECORD.unpack_from(buf, HEADER_SIZE + (i % capacity) * size)
+                   for i in range(start, end)]
+        valid = self._validate(start, end)
+        self.position = end
+        return records[valid - start:]
+
+    def read(self, max_records=None):
+        """New samples as (arrival_ns, SensorSample) pairs."""
+        samples = []
+        for _, arrival_ns, timestamp_ns, seq, device_id, flags, x, y, z, gyro_y in self.read_raw(max_records):
+            samples.append((arrival_ns, SensorSample(
+                x, y, z, gyro_y,
+                seq if flags & HAS_SEQ else None,
+                timestamp_ns if flags & HAS_TIMESTAMP else None,
+                device_id)))
+        return samples
+
+    def read_array(self, max_records=None):
+        """New records as NumPy structured arrays viewing the shared buffer.
+
+        Zero-copy: returns up to two views (the read may wrap around the end
+        of the ring). The views alias live memory; check still_valid(start)
+        after using them, or copy them, since the writer reuses slots.
+        Returns (start_seq, [views]).
+        """
+        import numpy as np
+
+        start, end = self._span(max_records)
+        records = np.ndarray((self.capacity,), dtype=NUMPY_DTYPE, buffer=self.buf, offset=HEADER_SIZE)
+        first, last = start % self.capacity, end % self.capacity
+        if end - start == 0:
+            views = []
+        elif first < last:
+            views = [records[first:last]]
+        else:
+            views = [records[first:], records[:last]]
+        self.position = end
+        return start, views
+
+    def still_valid(self, start_seq):
+        """True if the writer has not overwritten records from start_seq onwards."""
+        return self.write_seq() - self.window <= start_seq
+
+    def follow(self, poll_interval=0.002):
+        """Yield (arrival_ns, SensorSample) forever, sleeping while the ring is idle."""
+        while True:
+            samples = self.read()
+            if not samples:
+                time.sleep(poll_interval)
+                continue
+            yield from samples
+
+    def close(self):
+        if getattr(self, "_write_seq", None) is not None:
+            self._write_seq.release()
+        self.buf = None
+        self.shm.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read the listener's shared-memory sample ring")
+    parser.add_argument("command", choices=("tail", "stats"))
+    parser.add_argument("name", help="Ring name given to udp_listener.py --shm")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration for stats")
+    args = parser.parse_args()
+
+    try:
+        reader = SampleRingReader(args.name)
+    except FileNotFoundError:
+        raise SystemExit(f"❌ No sample ring named {args.name!r}; start udp_listener.py --shm {args.name}")
+    print(f"🔗 Attached to ring {args.name!r} ({reader.capacity} records)")
+    try:
+        if args.command == "tail":
+            for arrival_ns, sample in reader.follow():
+                print(f"{arrival_ns / 1e9:.6f}  seq={sample.seq}  x={sample.x:7.2f} y={sample.y:7.2f} "
+                      f"z={sample.z:7.2f} gyro_y={sample.gyro_y:6.2f}")
+        else:
+            count = 0
+            end = time.monotonic() + args.seconds
+            while time.monotonic() < end:
+                batch = reader.read_raw()
+                count += len(batch)
+                if not batch:
+                    time.sleep(0.005)
+            print(f"📊 {count} samples in {args.seconds:.1f} s ({count / args.seconds:.0f}/s), "
+                  f"{reader.overruns} overruns")
+    except KeyboardInterrupt:
+        print()
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Shared decoder for the sensor packets sent by the Android app.
+
+Two wire formats are accepted and auto-detected per packet:
+
+- Text (legacy):  ``SENSOR:x,y,z,gyro_y[,seq[,timestamp_ns]]``
+- Binary frame:   fixed 32-byte little-endian frame
+
+      offset  size  field
+      0       1     magic (0xA5)
+      1       1     version (1)
+      2       2     device_id (uint16, 0 = unspecified)
+      4       4     seq (uint32)
+      8       8     timestamp_ns (int64, sender monotonic clock)
+      16      16    accel_x, accel_y, accel_z, gyro_y (float32)
+
+The first byte of a text packet is always ``S`` (0x53), so checking the
+magic byte is enough to tell the two formats apart.
+
+Batched frame (WebSocket ingest, see ws_ingest.py): one header followed by
+`count` samples, so a sender can ship several readings per message
+
+      offset  size  field
+      0       1     magic (0xA6)
+      1       1     version (1)
+      2       2     device_id (uint16)
+      4       4     first_seq (uint32, sample i has seq first_seq + i)
+      8       8     base_timestamp_ns (int64, sender monotonic clock)
+      16      2     count (uint16)
+      18      2     reserved
+      20      20*N  per sample: offset_ns (uint32, added to base_timestamp_ns),
+                    accel_x, accel_y, accel_z, gyro_y (float32)
+"""
+
+import select
+import struct
+from typing import NamedTuple, Optional
+
+FRAME_MAGIC = 0xA5
+FRAME_VERSION = 1
+FRAME = struct.Struct("<BBHIq4f")
+FRAME_SIZE = FRAME.size  # 32 bytes
+MAX_PACKET_SIZE = 1024  # Receive buffer size used by all listeners
+BATCH_MAGIC = 0xA6
+BATCH_HEADER = struct.Struct("<BBHIqHH")  # 20 bytes
+BATCH_SAMPLE = struct.Struct("<I4f")  # 20 bytes
+MAX_BATCH_SAMPLES = 0xFFFF
+
+
+class ProtocolError(ValueError):
+    """Raised when a packet looks like sensor data but cannot be decoded."""
+
+
+class SensorSample(NamedTuple):
+    """One decoded sensor reading. seq/timestamp_ns are None when the sender omits them."""
+    x: float
+    y: float
+    z: float
+    gyro_y: float
+    seq: Optional[int] = None
+    timestamp_ns: Optional[int] = None
+    device_id: int = 0
+
+
+def encode_frame(x, y, z, gyro_y, seq=0, timestamp_ns=0, device_id=0):
+    """Pack one reading into a binary frame (used by test senders and replay tools)."""
+    return FRAME.pack(FRAME_MAGIC, FRAME_VERSION, device_id,
+                      seq & 0xFFFFFFFF, timestamp_ns, x, y, z, gyro_y)
+
+
+def encode_batch(readings, first_seq=0, base_timestamp_ns=0, device_id=0):
+    """Pack (offset_ns, x, y, z, gyro_y) readings into one batched frame."""
+    if len(readings) > MAX_BATCH_SAMPLES:
+        raise ValueError(f"At most {MAX_BATCH_SAMPLES} samples per batch")
+    out = bytearray(BATCH_HEADER.size + BATCH_SAMPLE.size * len(readings))
+    BATCH_HEADER.pack_into(out, 0, BATCH_MAGIC, FRAME_VERSION, device_id,
+                           first_seq & 0xFFFFFFFF, base_timestamp_ns, len(readings), 0)
+    offset = BATCH_HEADER.size
+    for reading in readings:
+        BATCH_SAMPLE.pack_into(out, offset, *reading)
+        offset += BATCH_SAMPLE.size
+    return bytes(out)
+
+
+def encode_text(x, y, z, gyro_y, seq=None, timestamp_ns=None):
+    """Format one reading as a SENSOR: text packet (seq/timestamp optional)."""
+    message = f"SENSOR:{x},{y},{z},{gyro_y}"
+    if seq is not None:
+        message += f",{seq}"
+        if timestamp_ns is not None:
+            message += f",{timestamp_ns}"
+    return message.encode()
+
+
+def decode_frame(buffer, nbytes=None):
+    """Decode a binary frame straight from a buffer (bytes, bytearray or memoryview)."""
+    if nbytes is None:
+        nbytes = len(buffer)
+    if nbytes < FRAME_SIZE:
+        raise ProtocolError(f"Short frame: {nbytes} bytes, expected {FRAME_SIZE}")
+    magic, version, device_id, seq, timestamp_ns, x, y, z, gyro_y = FRAME.unpack_from(buffer, 0)
+    if magic != FRAME_MAGIC:
+        raise ProtocolError(f"Bad magic byte 0x{magic:02X}")
+    if version != FRAME_VERSION:
+        raise ProtocolError(f"Unsupported frame version {version}")
+    return SensorSample(x, y, z, gyro_y, seq, timestamp_ns, device_id)
+
+
+def decode_text(buffer, nbytes=None):
+    """Decode a ``SENSOR:x,y,z,gyro_y[,seq[,timestamp_ns]]`` packet."""
+    if nbytes is None:
+        nbytes = len(buffer)
+    message = bytes(buffer[:nbytes]).decode().strip()
+    if not message.startswith("SENSOR:"):
+        raise ProtocolError("Message doesn't start with 'SENSOR:'")
+    parts = message[7:].split(',')
+    if not 4 <= len(parts) <= 6:
+        raise ProtocolError(f"Expected 4 to 6 values, got {len(parts)}")
+    try:
+        x, y, z, gyro_y = [float(p) for p in parts[:4]]
+        seq = int(parts[4]) if len(parts) > 4 else None
+        timestamp_ns = int(parts[5]) if len(parts) > 5 else None
+    except ValueError as e:
+        raise ProtocolError(f"Bad numeric field: {e}") from None
+    return SensorSample(x, y, z, gyro_y, seq, timestamp_ns)
+
+
+def decode_batch(buffer, nbytes=None):
+    """Decode a batched frame into a list of SensorSamples, oldest first."""
+    if nbytes is None:
+        nbytes = len(buffer)
+    if nbytes < BATCH_HEADER.size:
+        raise ProtocolError(f"Short batch: {nbytes} bytes")
+    magic, version, device_id, first_seq, base_ns, count, _ = BATCH_HEADER.unpack_from(buffer, 0)
+    if magic != BATCH_MAGIC:
+        raise ProtocolError(f"Bad magic byte 0x{magic:02X}")
+    if version != FRAME_VERSION:
+        raise ProtocolError(f"Unsupported frame version {version}")
+    end = BATCH_HEADER.size + count * BATCH_SAMPLE.size
+    if nbytes < end:
+        raise ProtocolError(f"Truncated batch: {nbytes} bytes for {count} samples")
+    return [SensorSample(x, y, z, gyro_y, (first_seq + i) & 0xFFFFFFFF, base_ns + offset_ns, device_id)
+            for i, (offset_ns, x, y, z, gyro_y)
+            in enumerate(BATCH_SAMPLE.iter_unpack(memoryview(buffer)[BATCH_HEADER.size:end]))]
+
+
+def decode_samples(buffer, nbytes=None):
+    """Decode any supported message into a list of samples (batches give several)."""
+    if nbytes is None:
+        nbytes = len(buffer)
+    if nbytes and buffer[0] == BATCH_MAGIC:
+        return decode_batch(buffer, nbytes)
+    return [decode_packet(buffer, nbytes)]
+
+
+def decode_packet(buffer, nbytes=None):
+    """Auto-detect the packet format and decode it.
+
+    Raises ProtocolError (a ValueError) for anything that is not a valid
+    sensor packet, so callers can keep their existing ``except ValueError``.
+    """
+    if nbytes is None:
+        nbytes = len(buffer)
+    if nbytes == 0:
+        raise ProtocolError("Empty packet")
+    if buffer[0] == FRAME_MAGIC:
+        return decode_frame(buffer, nbytes)
+    try:
+        return decode_text(buffer, nbytes)
+    except UnicodeDecodeError as e:
+        raise ProtocolError(f"Undecodable packet: {e}") from None
+
+
+class PacketReceiver:
+    """Receives datagrams into one reused buffer and decodes them in place.
+
+    Avoids allocating a new bytes object per packet on the binary path.
+    """
+
+    def __init__(self, sock, bufsize=MAX_PACKET_SIZE, recorder=None):
+        self.sock = sock
+        self.buffer = bytearray(bufsize)
+        self.view = memoryview(self.buffer)
+        self.recorder = recorder  # Optional SessionRecorder that sees every raw datagram
+
+    def receive(self):
+        """Block for one datagram and return (sample, addr). Raises ProtocolError."""
+        nbytes, addr = self.sock.recvfrom_into(self.buffer)
+        if self.recorder is not None:
+            self.recorder.record(self.view, nbytes)
+        return decode_packet(self.view, nbytes), addr
+
+    def receive_raw(self):
+        """Block for one datagram and return (nbytes, addr) without decoding.
+
+        The datagram is left in self.view so callers can time
+        decode_packet(self.view, nbytes) separately.
+        """
+        nbytes, addr = self.sock.recvfrom_into(self.buffer)
+        if self.recorder is not None:
+            self.recorder.record(self.view, nbytes)
+        return nbytes, addr
+
+    def drain(self, max_packets=256):
+        """Wait for data, then return every pending sensor sample in arrival order.
+
+        The socket must be non-blocking. Blocks in select() only while the
+        kernel queue is empty; malformed packets are skipped. At most
+        max_packets samples are returned per call.
+        """
+        samples = []
+        sock = self.sock
+        while len(samples) < max_packets:
+            try:
+                nbytes, _ = sock.recvfrom_into(self.buffer)
+            except BlockingIOError:
+                if samples:
+                    break
+                select.select([sock], [], [])
+                continue
+            if self.recorder is not None:
+                self.recorder.record(self.view, nbytes)
+            try:
+                samples.append(decode_packet(self.view, nbytes))
+            except ProtocolError:
+                continue
+        return samples
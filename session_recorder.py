@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Record and replay raw sensor streams.
+
+A session log is an append-only binary file: an 8-byte file header followed
+by one record per datagram
+
+    arrival_ns (int64, host monotonic clock) | length (uint16) | raw payload
+
+Payloads are stored exactly as received (binary frames or SENSOR: text), so
+a replay exercises the same decoder as a live phone.
+
+Usage:
+    python3 session_recorder.py record session.slog
+    python3 session_recorder.py replay session.slog --udp [--speed 2.0]
+    python3 session_recorder.py replay session.slog --direct
+"""
+
+import argparse
+import os
+import socket
+import struct
+import sys
+import time
+
+from sensor_protocol import MAX_PACKET_SIZE, ProtocolError, decode_packet
+
+LOG_MAGIC = b"SSLOG\x00\x01\x00"  # name, version 1
+RECORD_HEADER = struct.Struct("<qH")
+
+HOST_IP = '0.0.0.0'
+PORT = 12345
+
+
+class SessionRecorder:
+    """Appends raw datagrams with their arrival time to a session log."""
+
+    def __init__(self, path):
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'ab')
+        if new_file:
+            self._file.write(LOG_MAGIC)
+        self.records = 0
+
+    def record(self, payload, nbytes=None, arrival_ns=None):
+        """Append one datagram. `payload` may be a reused receive buffer."""
+        if nbytes is None:
+            nbytes = len(payload)
+        if arrival_ns is None:
+            arrival_ns = time.monotonic_ns()
+        self._file.write(RECORD_HEADER.pack(arrival_ns, nbytes))
+        self._file.write(payload[:nbytes])
+        self.records += 1
+
+    def close(self):
+        self._file.close()
+
+
+def read_session(path):
+    """Yield (arrival_ns, payload) for every record in a session log."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(LOG_MAGIC)] != LOG_MAGIC:
+        raise ValueError(f"{path} is not a session log")
+    view = memoryview(data)
+    offset = len(LOG_MAGIC)
+    header_size = RECORD_HEADER.size
+    while offset + header_size <= len(data):
+        arrival_ns, length = RECORD_HEADER.unpack_from(data, offset)
+        offset += header_size
+        if offset + length > len(data):
+            break  # Truncated final record (recorder was killed mid-write)
+        yield arrival_ns, view[offset:offset + length]
+        offset += length
+
+
+def record(path):
+    """Capture every datagram on PORT into a session log until Ctrl+C."""
+    recorder = SessionRecorder(path)
+    buffer = bytearray(MAX_PACKET_SIZE)
+    print(f"🎙️  Recording raw packets on {HOST_IP}:{PORT} to {path} (Ctrl+C to stop)")
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind((HOST_IP, PORT))
+        try:
+            while True:
+                nbytes, _ = s.recvfrom_into(buffer)
+                recorder.record(buffer, nbytes)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            recorder.close()
+    print(f"\n💾 Recorded {recorder.records} packets")
+
+
+def replay_udp(path, host, port, speed=1.0):
+    """Send a session log to a listener over UDP, preserving original timing."""
+    records = list(read_session(path))
+    if not records:
+        print("Session log is empty")
+        return
+    print(f"📡 Replaying {len(records)} packets to {host}:{port} at {speed}x")
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        first_ns = records[0][0]
+        start_ns = time.monotonic_ns()
+        for arrival_ns, payload in records:
+            if speed > 0:
+                due_ns = start_ns + (arrival_ns - first_ns) / speed
+                delay = (due_ns - time.monotonic_ns()) / 1e9
+                if delay > 0:
+                    time.sleep(delay)
+            s.sendto(payload, (host, port))
+        elapsed = (time.monotonic_ns() - start_ns) / 1e9
+    print(f"✅ Sent {len(records)} packets in {elapsed:.2f} s")
+
+
+def replay_direct(path):
+    """Feed a session log straight into the listener's detection pipeline.
+
+    Runs as fast as possible with the "record" key backend; the recorded
+    arrival times drive cooldowns and rotation integration, so results match
+    what the live controller would have done.
+    """
+    import udp_listener as listener
+    from key_backends import create_backend
+    from key_worker import KeyInjectionWorker
+
+    backend = create_backend("record")
+    listener.key_output = KeyInjectionWorker(backend)
+    listener.key_output.start()
+    samples = 0
+    malformed = 0
+    start = time.perf_counter()
+    for arrival_ns, payload in read_session(path):
+        try:
+            sample = decode_packet(payload)
+        except ProtocolError:
+            malformed += 1
+            continue
+        if not listener.accept_sample(sample, arrival_ns):
+            continue
+        current_time = arrival_ns / 1e9
+        jerk_force = listener.process_sensor_sample(sample, current_time)
+        listener.run_output_stage(sample.x, sample.y, sample.z, jerk_force, current_time)
+        samples += 1
+    elapsed = time.perf_counter() - start
+    listener.key_output.stop()
+    backend.close()
+
+    rate = samples / elapsed if elapsed > 0 else 0.0
+    print(f"⚡ Processed {samples} samples in {elapsed * 1000:.1f} ms ({rate:,.0f} samples/s), "
+          f"{malformed} malformed")
+    presses = sum(1 for _, kind, _ in backend.events if kind == "press")
+    releases = sum(1 for _, kind, _ in backend.events if kind == "release")
+    print(f"⌨️  Key events: {presses} presses, {releases} releases, "
+          f"still down: {backend.keys_down() or 'none'}")
+    print(f"📊 Stream: {listener.stream_stats.summary()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay raw sensor sessions")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="Capture raw packets to a session log")
+    rec.add_argument("path")
+
+    rep = sub.add_parser("replay", help="Replay a session log")
+    rep.add_argument("path")
+    mode = rep.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--udp", action="store_true", help="Send over UDP at original timing")
+    mode.add_argument("--direct", action="store_true",
+                      help="Feed the detection pipeline directly, as fast as possible")
+    rep.add_argument("--host", default="127.0.0.1")
+    rep.add_argument("--port", type=int, default=PORT)
+    rep.add_argument("--speed", type=float, default=1.0,
+                     help="Playback speed multiplier for --udp (0 = no delay)")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.path)
+    elif args.udp:
+        replay_udp(args.path, args.host, args.port, args.speed)
+    else:
+        replay_direct(args.path)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Rate-limited console status line for the motion controller.
+
+The receive loop only writes plain attributes on a StatusSnapshot; a
+background thread formats and prints the status line at a fixed rate, so
+no string formatting or stdout syscall happens per packet.
+"""
+
+import threading
+import time
+
+
+class StatusSnapshot:
+    """Latest controller state as seen by the receive loop."""
+
+    __slots__ = ("state", "facing_dir", "rotation_deg", "last_action",
+                 "last_value", "coalesced", "packets", "latency_ns_total")
+
+    def __init__(self):
+        self.state = "IDLE"
+        self.facing_dir = "RIGHT"
+        self.rotation_deg = 0.0
+        self.last_action = "NONE"
+        self.last_value = 0.0
+        self.coalesced = None
+        self.packets = 0
+        self.latency_ns_total = 0
+
+    def update(self, state, facing_dir, rotation_deg, last_action, last_value, coalesced=None):
+        self.state = state
+        self.facing_dir = facing_dir
+        self.rotation_deg = rotation_deg
+        self.last_action = last_action
+        self.last_value = last_value
+        self.coalesced = coalesced
+
+    def record_packets(self, count, latency_ns):
+        """Account for `count` packets processed in `latency_ns` total."""
+        self.packets += count
+        self.latency_ns_total += latency_ns
+
+
+class StatusDisplay:
+    """Redraws the single-line status from a StatusSnapshot at `hz` times per second.
+
+    If a StreamStats is given, its loss/jitter/latency readout is appended
+    once sequenced packets have been seen. If a GestureEngine is given, the
+    state fields are copied from it at render time instead of relying on the
+    receive loop to call StatusSnapshot.update().
+    """
+
+    def __init__(self, snapshot, hz=15.0, stream_stats=None, engine=None):
+        self.snapshot = snapshot
+        self.stream_stats = stream_stats
+        self.engine = engine
+        self.interval = 1.0 / hz
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_packets = 0
+        self._last_latency_ns = 0
+        self._last_time = time.perf_counter()
+        self.histogram = None  # Optional metrics.LatencyHistogram of render times
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="status-display", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if self.histogram is not None:
+                start_ns = time.perf_counter_ns()
+                self.render()
+                self.histogram.observe(time.perf_counter_ns() - start_ns)
+            else:
+                self.render()
+
+    def render(self):
+        """Print one status line with packets/sec and mean processing latency."""
+        snap = self.snapshot
+        engine = self.engine
+        if engine is not None:
+            snap.update(engine.current_state, engine.facing_dir, engine.rotation_deg,
+                        engine.last_action, engine.last_action_value, snap.coalesced)
+        now = time.perf_counter()
+        packets = snap.packets
+        latency_ns = snap.latency_ns_total
+        new_packets = packets - self._last_packets
+        elapsed = now - self._last_time
+        pps = new_packets / elapsed if elapsed > 0 else 0.0
+        latency_us = (latency_ns - self._last_latency_ns) / new_packets / 1e3 if new_packets else 0.0
+        self._last_packets = packets
+        self._last_latency_ns = latency_ns
+        self._last_time = now
+
+        extra = f" | COALESCED: {snap.coalesced}" if snap.coalesced is not None else ""
+        link = self.stream_stats
+        if link is not None and link.accepted:
+            extra += (f" | LOSS {link.recent_loss_rate * 100:4.1f}% | "
+                      f"JIT {link.jitter_ns / 1e6:4.1f} ms | LAT {link.latency_ns / 1e6:4.1f} ms")
+        print(f"\rSTATE: {snap.state:7} | FACING: {snap.facing_dir} ({snap.rotation_deg:4.0f}°) | "
+              f"LAST ACTION: {snap.last_action} ({snap.last_value:.1f}) | "
+              f"{pps:5.0f} pkt/s | {latency_us:6.1f} µs{extra}", end="", flush=True)
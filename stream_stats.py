@@ -0,0 +1,130 @@
+"""
+Live link-quality accounting for the sensor stream.
+
+Uses the sequence number and sender monotonic timestamp carried by binary
+frames (or by the extended text format) to drop duplicate/late packets,
+provide sender-side dt for gyro integration, and keep loss, reorder,
+jitter and latency statistics.
+"""
+
+from collections import deque
+
+SEQ_MASK = 0xFFFFFFFF
+SEQ_HALF = 1 << 31
+RESYNC_GAP = 1000  # A jump larger than this (either way) is treated as a sender restart
+JITTER_GAIN = 1 / 16  # RFC 3550 smoothing factor, also used for the latency estimate
+
+
+class StreamStats:
+    """Sequence/timestamp tracker for one sensor stream.
+
+    Latency is estimated as the excess of (arrival - sender timestamp) over
+    the smallest value seen so far. The two clocks are unrelated, so this is
+    the one-way delay above the fastest observed packet, not absolute delay.
+    """
+
+    def __init__(self, window=256):
+        self.last_seq = None
+        self.last_sender_ns = None
+        self.last_arrival_ns = None
+        self.sender_dt = None  # Sender-side seconds since the previous accepted packet
+
+        self.received = 0
+        self.accepted = 0
+        self.lost = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.restarts = 0
+
+        self.jitter_ns = 0.0
+        self.latency_ns = 0.0
+        self.min_offset_ns = None
+
+        # Rolling loss window: gap size recorded per accepted packet
+        self._gaps = deque(maxlen=window)
+        self._gap_sum = 0
+
+    def accept(self, seq, sender_ns, arrival_ns):
+        """Record one packet. Returns False if it is a duplicate or arrived late."""
+        self.received += 1
+
+        if self.last_seq is not None:
+            diff = (seq - self.last_seq) & SEQ_MASK
+            if diff == 0:
+                self.duplicates += 1
+                return False
+            if diff >= SEQ_HALF and SEQ_MASK + 1 - diff <= RESYNC_GAP:
+                self.reordered += 1
+                return False
+            if diff > RESYNC_GAP:
+                self._resync()
+                gap = 0
+            else:
+                gap = diff - 1
+        else:
+            gap = 0
+
+        self.lost += gap
+        if len(self._gaps) == self._gaps.maxlen:
+            self._gap_sum -= self._gaps[0]
+        self._gaps.append(gap)
+        self._gap_sum += gap
+
+        if sender_ns is not None:
+            self._update_timing(sender_ns, arrival_ns)
+
+        self.last_seq = seq
+        self.accepted += 1
+        return True
+
+    def _update_timing(self, sender_ns, arrival_ns):
+        if self.last_sender_ns is not None:
+            sender_delta = sender_ns - self.last_sender_ns
+            self.sender_dt = sender_delta / 1e9
+            transit_delta = (arrival_ns - self.last_arrival_ns) - sender_delta
+            self.jitter_ns += (abs(transit_delta) - self.jitter_ns) * JITTER_GAIN
+        else:
+            self.sender_dt = None
+
+        offset = arrival_ns - sender_ns
+        if self.min_offset_ns is None or offset < self.min_offset_ns:
+            self.min_offset_ns = offset
+        self.latency_ns += ((offset - self.min_offset_ns) - self.latency_ns) * JITTER_GAIN
+
+        self.last_sender_ns = sender_ns
+        self.last_arrival_ns = arrival_ns
+
+    def _resync(self):
+        """Sender restarted: forget timing history but keep the counters."""
+        self.restarts += 1
+        self.last_sender_ns = None
+        self.last_arrival_ns = None
+        self.min_offset_ns = None
+        self.sender_dt = None
+
+    @property
+    def loss_rate(self):
+        """Fraction of packets lost over the whole session."""
+        expected = self.accepted + self.lost
+        return self.lost / expected if expected else 0.0
+
+    @property
+    def recent_loss_rate(self):
+        """Fraction of packets lost over the last `window` accepted packets."""
+        expected = len(self._gaps) + self._gap_sum
+        return self._gap_sum / expected if expected else 0.0
+
+    def summary(self):
+        """Machine-readable snapshot of all counters."""
+        return {
+            "received": self.received,
+            "accepted": self.accepted,
+            "lost": self.lost,
+            "duplicates": self.duplicates,
+            "reordered": self.reordered,
+            "restarts": self.restarts,
+            "loss_rate": round(self.loss_rate, 5),
+            "recent_loss_rate": round(self.recent_loss_rate, 5),
+            "jitter_ms": round(self.jitter_ns / 1e6, 3),
+            "latency_ms": round(self.latency_ns / 1e6, 3),
+        }
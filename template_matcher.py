@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Streaming template matcher for the gestures recorded by calibrate.py.
+
+Each recorded turn_around / punch / jump clip contributes one template: the
+highest-energy stretch of its (jerk, gyro_y) signal. The live stream is
+compared against every template with banded DTW (Sakoe-Chiba). A window's
+score for a template is its DTW distance divided by the template's energy
+(its distance to a flat signal), so a score below the threshold means the
+window explains most of the template's motion. To keep a full pass over
+all templates inside one inter-packet interval:
+
+- the stream is decimated (default: pairs of samples are averaged)
+- LB_Keogh lower bounds for all templates are computed in one NumPy
+  operation, and templates are tried in ascending bound order; a template
+  whose bound cannot beat its threshold or the best score so far is skipped
+- DTW abandons a template as soon as the best cell of a row plus the
+  LB_Keogh bound of the rows still to come exceeds that limit
+
+Per-sample cost is measured on every push and reported by stats().
+
+Usage:
+    python3 template_matcher.py                  # leave-one-out accuracy + cost on gesture_data
+    python3 udp_listener.py --templates gesture_data
+"""
+
+import argparse
+import math
+import sys
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from gesture_engine import GRAVITY_CONSTANT, SAMPLE_INTERVAL_S
+from gesture_store import DATA_DIR, load_clip_arrays
+
+TEMPLATE_GESTURES = ("turn_around", "punch", "jump")
+DEFAULT_LENGTH = 32  # Template length in decimated points
+DEFAULT_DECIMATE = 2  # Raw samples averaged into one point
+DEFAULT_RADIUS = 4  # Sakoe-Chiba band half-width, in points
+DEFAULT_THRESHOLD = 0.4  # Max score (DTW distance / template energy) that counts as a match
+
+
+class Match(NamedTuple):
+    gesture: str
+    distance: float   # DTW distance (sum of squared scaled differences)
+    score: float      # distance / template energy
+    template: int     # Index into TemplateMatcher.templates
+    sample: int       # Raw sample count at which the match fired
+
+
+class Template(NamedTuple):
+    gesture: str
+    series: np.ndarray  # (L, 2) scaled features
+    upper: np.ndarray   # LB_Keogh envelope, (L, 2)
+    lower: np.ndarray
+    energy: float       # Sum of squares = DTW distance to a flat signal
+
+
+def gesture_features(samples):
+    """(N, 4) x, y, z, gyro_y samples -> (N, 2) jerk, gyro_y features."""
+    samples = np.asarray(samples, dtype=np.float64)
+    jerk = np.sqrt((samples[:, :3] ** 2).sum(axis=1)) - GRAVITY_CONSTANT
+    return np.stack([jerk, samples[:, 3]], axis=1)
+
+
+def decimate_features(features, factor):
+    """Average non-overlapping groups of `factor` rows (trailing rows dropped)."""
+    if factor == 1:
+        return features
+    n = len(features) // factor * factor
+    return features[:n].reshape(-1, factor, features.shape[1]).mean(axis=1)
+
+
+def extract_segment(features, length):
+    """The `length` rows with the most energy (the gesture itself)."""
+    if len(features) <= length:
+        return np.pad(features, ((0, length - len(features)), (0, 0)), mode='edge')
+    energy = np.concatenate(([0.0], np.cumsum((features ** 2).sum(axis=1))))
+    start = int(np.argmax(energy[length:] - energy[:-length]))
+    return features[start:start + length]
+
+
+def envelope(series, radius):
+    """Running max/min of each channel over +-radius rows."""
+    padded = np.pad(series, ((radius, radius), (0, 0)), mode='edge')
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * radius + 1, axis=0)
+    return windows.max(axis=2), windows.min(axis=2)
+
+
+def lb_keogh(query, upper, lower):
+    """LB_Keogh of one (L, C) query against stacked (T, L, C) envelopes.
+
+    Returns the per-row contributions, shape (T, L); their sum is the bound.
+    """
+    above = np.maximum(query - upper, 0.0)
+    below = np.maximum(lower - query, 0.0)
+    return (above * above + below * below).sum(axis=2)
+
+
+def dtw_distance(a0, a1, b0, b1, radius, abandon_at=math.inf, tail=None):
+    """Banded DTW between two 2-channel series given as per-channel lists.
+
+    Returns math.inf as soon as the best cell of a row, plus `tail[i]` (a
+    lower bound on the cost of the rows after row i, e.g. the remaining
+    LB_Keogh contributions), exceeds abandon_at.
+    """
+    n = len(a0)
+    inf = math.inf
+    previous = [inf] * (n + 1)
+    previous[0] = 0.0
+    for i in range(1, n + 1):
+        current = [inf] * (n + 1)
+        x0, x1 = a0[i - 1], a1[i - 1]
+        row_min = inf
+        for j in range(max(1, i - radius), min(n, i + radius) + 1):
+            d0 = x0 - b0[j - 1]
+            d1 = x1 - b1[j - 1]
+            best = previous[j - 1]
+            if previous[j] < best:
+                best = previous[j]
+            if current[j - 1] < best:
+                best = current[j - 1]
+            value = d0 * d0 + d1 * d1 + best
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min + (tail[i - 1] if tail is not None else 0.0) > abandon_at:
+            return inf
+        previous = current
+    return previous[n]
+
+
+class TemplateMatcher:
+    """Matches the live stream against recorded gesture templates.
+
+    Call push() for every sample; it returns a Match when a window of the
+    stream scores below its gesture's threshold on some template (the best
+    score across gestures wins). After a match, evaluation pauses for one
+    template length so a single gesture fires once.
+    """
+
+    def __init__(self, templates, thresholds, scale, length=DEFAULT_LENGTH,
+                 decimate=DEFAULT_DECIMATE, radius=DEFAULT_RADIUS):
+        self.templates = templates
+        self.thresholds = thresholds
+        self.scale = scale  # Per-channel divisor applied to live features
+        self.length = length
+        self.decimate = decimate
+        self.radius = radius
+
+        # Envelopes stacked so LB_Keogh for all templates is one array operation
+        self._upper = np.stack([t.upper for t in templates])
+        self._lower = np.stack([t.lower for t in templates])
+        self._energy = np.array([t.energy for t in templates])
+        self._limits = [thresholds[t.gesture] for t in templates]
+        self._lists = [(t.series[:, 0].tolist(), t.series[:, 1].tolist()) for t in templates]
+
+        self._window = np.zeros((length, 2))
+        self._filled = 0
+        self._pending = [0.0, 0.0, 0]  # Decimation accumulator: jerk sum, gyro sum, count
+        self._cooldown = 0
+        self.samples = 0
+
+        # Cost accounting
+        self.evaluations = 0
+        self.lb_pruned = 0
+        self.abandoned = 0
+        self.full_dtw = 0
+        self.cost_ns_total = 0
+        self.cost_ns_max = 0
+        self.matches = {t.gesture: 0 for t in templates}
+
+    @classmethod
+    def from_clips(cls, clips, length=DEFAULT_LENGTH, decimate=DEFAULT_DECIMATE,
+                   radius=DEFAULT_RADIUS, threshold=DEFAULT_THRESHOLD):
+        """Build templates from {gesture: [(N, 4) samples, ...]}.
+
+        `threshold` is one score for every gesture or a {gesture: score} dict.
+        """
+        segments = []
+        for gesture, recordings in clips.items():
+            for samples in recordings:
+                if len(samples):
+                    features = decimate_features(gesture_features(samples), decimate)
+                    segments.append((gesture, extract_segment(features, length)))
+        if not segments:
+            raise ValueError("No template recordings")
+        scale = np.concatenate([s for _, s in segments]).std(axis=0)
+        scale[scale == 0] = 1.0
+
+        templates = []
+        for gesture, segment in segments:
+            series = segment / scale
+            upper, lower = envelope(series, radius)
+            templates.append(Template(gesture, series, upper, lower, float((series ** 2).sum())))
+
+        if not isinstance(threshold, dict):
+            threshold = {gesture: threshold for gesture, _ in segments}
+        return cls(templates, threshold, scale, length, decimate, radius)
+
+    @classmethod
+    def from_recordings(cls, data_dir=DATA_DIR, gestures=TEMPLATE_GESTURES, **kwargs):
+        clips = {g: c for g, c in load_clip_arrays(data_dir).items() if g in gestures}
+        return cls.from_clips(clips, **kwargs)
+
+    def reset(self):
+        self._filled = 0
+        self._pending = [0.0, 0.0, 0]
+        self._cooldown = 0
+
+    def push(self, sample):
+        """Feed one SensorSample; returns a Match or None."""
+        start_ns = time.perf_counter_ns()
+        self.samples += 1
+        pending = self._pending
+        pending[0] += math.sqrt(sample.x ** 2 + sample.y ** 2 + sample.z ** 2) - GRAVITY_CONSTANT
+        pending[1] += sample.gyro_y
+        pending[2] += 1
+        match = None
+        if pending[2] == self.decimate:
+            point = (pending[0] / self.decimate / self.scale[0],
+                     pending[1] / self.decimate / self.scale[1])
+            self._pending = [0.0, 0.0, 0]
+            window = self._window
+            window[:-1] = window[1:]
+            window[-1] = point
+            if self._filled < self.length:
+                self._filled += 1
+            if self._cooldown:
+                self._cooldown -= 1
+            elif self._filled == self.length:
+                match = self._evaluate(window)
+                if match is not None:
+                    self._cooldown = self.length
+                    self.matches[match.gesture] += 1
+
+        cost_ns = time.perf_counter_ns() - start_ns
+        self.cost_ns_total += cost_ns
+        if cost_ns > self.cost_ns_max:
+            self.cost_ns_max = cost_ns
+        return match
+
+    def _evaluate(self, window):
+        self.evaluations += 1
+        rows = lb_keogh(window, self._upper, self._lower)
+        # tails[k][i]: bound contributed by query rows after row i
+        tails = (rows[:, ::-1].cumsum(axis=1)[:, ::-1] - rows).tolist()
+        energy = self._energy.tolist()
+        bounds = (rows.sum(axis=1) / self._energy).tolist()
+        q0 = window[:, 0].tolist()
+        q1 = window[:, 1].tolist()
+
+        best = None
+        best_score = math.inf
+        for k in sorted(range(len(bounds)), key=bounds.__getitem__):
+            limit = min(self._limits[k], best_score)
+            if bounds[k] >= limit:
+                self.lb_pruned += 1
+                continue
+            distance = dtw_distance(q0, q1, *self._lists[k], self.radius,
+                                    limit * energy[k], tails[k])
+            if distance == math.inf:
+                self.abandoned += 1
+                continue
+            self.full_dtw += 1
+            score = distance / energy[k]
+            if score < limit:
+                best_score = score
+                best = Match(self.templates[k].gesture, distance, score, k, self.samples)
+        return best
+
+    def stats(self):
+        """Cost and pruning counters; cost is per pushed sample."""
+        comparisons = self.evaluations * len(self.templates)
+        return {
+            "templates": len(self.templates),
+            "samples": self.samples,
+            "evaluations": self.evaluations,
+            "cost_avg_us": round(self.cost_ns_total / self.samples / 1e3, 2) if self.samples else 0.0,
+            "cost_max_us": round(self.cost_ns_max / 1e3, 2),
+            "lb_pruned": round(self.lb_pruned / comparisons, 3) if comparisons else 0.0,
+            "abandoned": round(self.abandoned / comparisons, 3) if comparisons else 0.0,
+            "full_dtw": round(self.full_dtw / comparisons, 3) if comparisons else 0.0,
+            "matches": dict(self.matches),
+        }
+
+
+def evaluate(clips, gestures=TEMPLATE_GESTURES, **kwargs):
+    """Leave-one-clip-out: stream every clip through a matcher built from the others.
+
+    Returns ({true gesture: {first matched gesture or None: count}}, [per-clip stats]).
+    """
+    from sensor_protocol import SensorSample
+
+    confusion = {}
+    clip_stats = []
+    for label, recordings in clips.items():
+        for held_out in range(len(recordings)):
+            templates = {g: [c for i, c in enumerate(cs) if not (g == label and i == held_out)]
+                         for g, cs in clips.items() if g in gestures}
+            matcher = TemplateMatcher.from_clips(templates, **kwargs)
+            first = None
+            for row in recordings[held_out].tolist():
+                match = matcher.push(SensorSample(*row))
+                if match is not None and first is None:
+                    first = match.gesture
+            confusion.setdefault(label, {})
+            confusion[label][first] = confusion[label].get(first, 0) + 1
+            clip_stats.append(matcher.stats())
+    return confusion, clip_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the gesture template matcher on gesture_data")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--length", type=int, default=DEFAULT_LENGTH, help="Template length in points")
+    parser.add_argument("--decimate", type=int, default=DEFAULT_DECIMATE)
+    parser.add_argument("--radius", type=int, default=DEFAULT_RADIUS, help="DTW band half-width")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Max score (DTW distance / template energy) for a match")
+    args = parser.parse_args()
+
+    clips = load_clip_arrays(args.data_dir)
+    if not any(g in clips for g in TEMPLATE_GESTURES):
+        print(f"❌ No turn_around/punch/jump recordings found in {args.data_dir}/")
+        return 1
+
+    kwargs = dict(length=args.length, decimate=args.decimate, radius=args.radius,
+                  threshold=args.threshold)
+    confusion, clip_stats = evaluate(clips, **kwargs)
+
+    print("🎯 Leave-one-out first match per clip:")
+    for label, results in confusion.items():
+        row = ", ".join(f"{g or 'none'}: {n}" for g, n in sorted(results.items(), key=lambda r: -r[1]))
+        print(f"   {label:<12} {row}")
+
+    templates = clip_stats[0]["templates"]
+    avg_us = sum(s["cost_avg_us"] for s in clip_stats) / len(clip_stats)
+    max_us = max(s["cost_max_us"] for s in clip_stats)
+    budget_us = SAMPLE_INTERVAL_S * 1e6
+    print(f"\n⏱️  Cost with {templates} templates: {avg_us:.1f} µs/sample avg, {max_us:.0f} µs max "
+          f"({max_us / budget_us * 100:.1f}% of the {budget_us / 1e3:.0f} ms packet interval)")
+    print(f"   ≈ {max_us / templates:.0f} µs per template per evaluation (worst case)")
+    pruned = sum(s["lb_pruned"] for s in clip_stats) / len(clip_stats)
+    abandoned = sum(s["abandoned"] for s in clip_stats) / len(clip_stats)
+    print(f"   Comparisons pruned by LB_Keogh: {pruned * 100:.0f}%, abandoned early: {abandoned * 100:.0f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,7 @@ Run this instead of udp_listener.py to test the Android app transmission.
 """
 
 import socket
+from sensor_protocol import FRAME_MAGIC, ProtocolError, decode_packet
 
 HOST_IP = '0.0.0.0'
 PORT = 12345
@@ -25,28 +26,21 @@ with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
     try:
         while True:
             data, addr = s.recvfrom(1024)
-            message = data.decode().strip()
             packet_count += 1
 
             print(f"Packet #{packet_count} from {addr[0]}:")
-            print(f"  Raw message: {message}")
-
-            if message.startswith("SENSOR:"):
-                try:
-                    parts = message.replace("SENSOR:", "").split(',')
-                    print(f"  Number of values: {len(parts)}")
-                    print(f"  Values: {parts}")
-
-                    if len(parts) == 4:
-                        x, y, z, gyro_y = [float(p) for p in parts]
-                        print(f"  ✅ CORRECT FORMAT: x={x:.2f}, y={y:.2f}, z={z:.2f}, gyro_y={gyro_y:.2f}")
-                    else:
-                        print(f"  ❌ WRONG FORMAT: Expected 4 values, got {len(parts)}")
-
-                except Exception as e:
-                    print(f"  ❌ PARSE ERROR: {e}")
+            if data and data[0] == FRAME_MAGIC:
+                print(f"  Binary frame ({len(data)} bytes): {data.hex()}")
             else:
-                print(f"  ❌ INVALID FORMAT: Message doesn't start with 'SENSOR:'")
+                print(f"  Raw message: {data.decode(errors='replace').strip()}")
+
+            try:
+                sample = decode_packet(data)
+                print(f"  ✅ CORRECT FORMAT: x={sample.x:.2f}, y={sample.y:.2f}, z={sample.z:.2f}, gyro_y={sample.gyro_y:.2f}")
+                if sample.seq is not None:
+                    print(f"  Frame header: device={sample.device_id} seq={sample.seq} timestamp_ns={sample.timestamp_ns}")
+            except ProtocolError as e:
+                print(f"  ❌ WRONG FORMAT: {e}")
 
             print("-" * 50)
 
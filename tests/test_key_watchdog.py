@@ -0,0 +1,37 @@
+import threading
+
+from gesture_engine import DEFAULT_PROFILE, GestureEngine
+from key_backends import RecordingBackend
+from key_watchdog import KeyHoldWatchdog
+from key_worker import KeyInjectionWorker
+from status_display import StatusSnapshot
+
+
+def make_watchdog(**kwargs):
+    engine = GestureEngine(DEFAULT_PROFILE)
+    engine.walking_key_pressed = True
+    engine.current_walking_key = "right"
+    worker = KeyInjectionWorker(RecordingBackend())
+    watchdog = KeyHoldWatchdog(engine, worker, StatusSnapshot(), log=lambda message: None, **kwargs)
+    return engine, worker, watchdog
+
+
+def test_stall_releases_held_keys():
+    engine, worker, watchdog = make_watchdog(silence_timeout=0.5)
+    watchdog.check(now=watchdog._last_activity + 1.0)
+    assert not engine.walking_key_pressed
+    assert watchdog.stats() == {"stalls": 1, "forced_releases": 1}
+    assert worker.stats()["pending"] == 1
+
+
+def test_check_waits_for_the_shared_lock():
+    lock = threading.Lock()
+    engine, _, watchdog = make_watchdog(silence_timeout=0.5, lock=lock)
+    with lock:
+        tick = threading.Thread(target=watchdog.check, args=(watchdog._last_activity + 1.0,))
+        tick.start()
+        tick.join(0.1)
+        assert tick.is_alive()
+        assert engine.walking_key_pressed
+    tick.join()
+    assert not engine.walking_key_pressed
@@ -0,0 +1,34 @@
+from key_backends import RecordingBackend
+from key_worker import PRESS, RELEASE, KeyInjectionWorker
+
+
+class FailingBackend(RecordingBackend):
+    """Raises on one key name, records the rest."""
+
+    def press(self, name):
+        if name is None:
+            raise ValueError("no key")
+        super().press(name)
+
+
+def test_backend_errors_are_counted_and_worker_keeps_running():
+    backend = FailingBackend()
+    worker = KeyInjectionWorker(backend)
+    worker.start()
+    worker.submit(PRESS, None)
+    worker.stop()
+    worker.start()
+    worker.submit(PRESS, "z")
+    worker.submit(RELEASE, "z")
+    worker.stop()
+    assert worker.stats()["errors"] == 1
+    assert worker.stats()["injected"] == 2
+    assert backend.keys_down() == []
+
+
+def test_release_then_press_of_held_key_cancels_out():
+    worker = KeyInjectionWorker(RecordingBackend())
+    worker.submit(RELEASE, "right")
+    worker.submit(PRESS, "right")
+    assert worker.stats()["pending"] == 0
+    assert worker.stats()["merged"] == 2
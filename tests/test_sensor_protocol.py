@@ -0,0 +1,58 @@
+import pytest
+
+from sensor_protocol import (FRAME_SIZE, ProtocolError, SensorSample, decode_batch, decode_packet,
+                             decode_samples, encode_batch, encode_frame, encode_text)
+
+
+def test_frame_round_trip():
+    sample = decode_packet(encode_frame(1.5, -2.0, 9.75, 0.25, seq=7, timestamp_ns=123456789, device_id=3))
+    assert sample == SensorSample(1.5, -2.0, 9.75, 0.25, 7, 123456789, 3)
+
+
+@pytest.mark.parametrize("seq, timestamp_ns", [(None, None), (42, None), (42, 987654321)])
+def test_text_round_trip(seq, timestamp_ns):
+    sample = decode_packet(encode_text(1.5, -2.0, 9.75, 0.25, seq, timestamp_ns))
+    assert sample == SensorSample(1.5, -2.0, 9.75, 0.25, seq, timestamp_ns)
+
+
+def test_batch_round_trip():
+    readings = [(0, 1.0, 2.0, 3.0, 0.5), (30_000_000, 4.0, 5.0, 6.0, -0.5)]
+    samples = decode_samples(encode_batch(readings, first_seq=0xFFFFFFFF, base_timestamp_ns=1000, device_id=9))
+    assert samples == [SensorSample(1.0, 2.0, 3.0, 0.5, 0xFFFFFFFF, 1000, 9),
+                       SensorSample(4.0, 5.0, 6.0, -0.5, 0, 30_001_000, 9)]
+
+
+def test_decode_with_nbytes_ignores_trailing_buffer():
+    buffer = bytearray(1024)
+    frame = encode_frame(1.0, 2.0, 3.0, 4.0, seq=1)
+    buffer[:len(frame)] = frame
+    assert decode_packet(memoryview(buffer), len(frame)).seq == 1
+
+
+@pytest.mark.parametrize("packet", [
+    b"",
+    b"SENSOR:1,2,3,abc",
+    b"SENSOR:1,2,3,4,x",
+    b"SENSOR:1,2,3,4,5,1.5",
+    b"SENSOR:1,2,3",
+    b"SENSOR:1,2,3,4,5,6,7",
+    b"HELLO",
+    b"SENSOR:\xff\xfe",
+    encode_frame(1.0, 2.0, 3.0, 4.0)[:FRAME_SIZE - 1],
+    bytes([0xA5, 2]) + encode_frame(1.0, 2.0, 3.0, 4.0)[2:],
+])
+def test_malformed_packets_raise_protocol_error(packet):
+    with pytest.raises(ProtocolError):
+        decode_packet(packet)
+
+
+def test_malformed_batches_raise_protocol_error():
+    batch = encode_batch([(0, 1.0, 2.0, 3.0, 4.0)] * 3)
+    with pytest.raises(ProtocolError):
+        decode_batch(batch[:-1])
+    with pytest.raises(ProtocolError):
+        decode_batch(batch[:10])
+    with pytest.raises(ProtocolError):
+        decode_batch(bytes([0xA6, 2]) + batch[2:])
+    with pytest.raises(ProtocolError):
+        decode_samples(b"SENSOR:1,2,3,nan-ish")
@@ -0,0 +1,31 @@
+from gesture_engine import DEFAULT_PROFILE, GestureEngine
+from key_backends import NullBackend
+from key_worker import KeyInjectionWorker
+from sensor_protocol import encode_batch
+from ws_ingest import WebSocketIngest
+
+
+def make_ingest():
+    return WebSocketIngest(GestureEngine(DEFAULT_PROFILE), KeyInjectionWorker(NullBackend()))
+
+
+def test_empty_batch_is_ignored():
+    ingest = make_ingest()
+    assert ingest.handle_message(encode_batch([])) == 0
+    assert ingest.summary()["messages"] == 1
+    assert ingest.summary()["samples"] == 0
+
+
+def test_malformed_message_is_rejected():
+    ingest = make_ingest()
+    assert ingest.handle_message("SENSOR:1,2,3,abc") == 0
+    assert ingest.summary()["rejected"] == 1
+
+
+def test_release_keys_releases_held_walking_key():
+    ingest = make_ingest()
+    ingest.engine.walking_key_pressed = True
+    ingest.engine.current_walking_key = "right"
+    assert ingest.release_keys() == 1
+    assert not ingest.engine.walking_key_pressed
+    assert ingest.release_keys() == 0
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Automatic threshold tuning against the labelled recordings in gesture_data/.
+
+Instead of deriving each threshold from a one-off heuristic (top-5 jerk
+peaks x 0.8, half the z range, ...), every candidate profile is run through
+GestureEngine.run_batch on all recorded clips and scored by the detection
+precision/recall and trigger latency it produces. Candidates are evaluated
+in parallel across all cores and the best profile is written to a JSON file
+that udp_listener.py can load with --profile.
+
+Usage:
+    python3 tune_thresholds.py                       # random search, 2000 trials
+    python3 tune_thresholds.py --search grid
+    python3 udp_listener.py --profile calibration_profile.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from gesture_engine import SAMPLE_INTERVAL_S, TURN_THRESHOLD, GestureEngine
+from gesture_store import DATA_DIR, load_clip_arrays
+
+# Parameter search space: grid values (random search samples uniformly between min and max)
+SEARCH_SPACE = {
+    'PUNCH_THRESHOLD': [4.0, 6.0, 8.0, 10.0, 12.0, 14.0, 16.0, 18.0, 20.0],
+    'JUMP_THRESHOLD': [4.0, 6.0, 8.0, 10.0, 12.0, 14.0, 16.0, 18.0, 20.0],
+    'WALK_SWING_AMPLITUDE': [1.0, 1.5, 2.0, 3.0, 4.0, 5.0],
+    'WALK_GYRO_NOISE_LIMIT': [0.1, 0.25, 0.5, 0.75, 1.0],
+    'ACTION_COOLDOWN': [0.15, 0.3, 0.45],
+    'STATE_BUFFER_SIZE': [3, 5, 7],
+}
+INTEGER_PARAMS = {'STATE_BUFFER_SIZE'}
+
+# Which detection each recording is labelled with
+GESTURE_ACTIONS = {
+    'punch': 'PUNCH',
+    'jump': 'JUMP_START',
+    'walking': 'WALK_KEY_PRESS',
+    'turn_around': 'TURN',  # Rotation crossing TURN_THRESHOLD, not a key action
+}
+
+_clips = None  # Per-worker dataset: [(gesture, samples ndarray), ...]
+
+
+def _init_worker(clips):
+    global _clips
+    _clips = clips
+
+
+def first_detections(profile, clips):
+    """For every clip, the sample index of the first detection of each gesture."""
+    engine = GestureEngine(profile)
+    detections = []
+    for _, samples in clips:
+        result = engine.run_batch(samples)
+        first = {}
+        for index, action in result.actions:
+            first.setdefault(action.name, index)
+        turned = np.flatnonzero(result.rotation >= TURN_THRESHOLD)
+        if len(turned):
+            first['TURN'] = int(turned[0])
+        detections.append(first)
+    return detections
+
+
+def score_profile(profile, clips=None, latency_weight=0.1):
+    """Score one candidate: mean F1 over gestures minus a latency penalty."""
+    clips = clips if clips is not None else _clips
+    detections = first_detections(profile, clips)
+
+    per_gesture = {}
+    latency_penalty = 0.0
+    for gesture, action in GESTURE_ACTIONS.items():
+        tp = fp = fn = 0
+        latencies = []  # Seconds from clip start to first trigger
+        fractions = []  # Same, as a fraction of the clip length
+        for (label, samples), first in zip(clips, detections):
+            hit = action in first
+            if label == gesture:
+                if hit:
+                    tp += 1
+                    latencies.append(first[action] * SAMPLE_INTERVAL_S)
+                    fractions.append(first[action] / len(samples))
+                else:
+                    fn += 1
+            elif hit:
+                fp += 1
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        per_gesture[gesture] = {
+            'precision': round(precision, 3),
+            'recall': round(recall, 3),
+            'f1': round(f1, 3),
+            'latency_s': round(float(np.mean(latencies)), 3) if latencies else None,
+        }
+        # Undetected gestures count as the worst possible latency
+        latency_penalty += float(np.mean(fractions)) if fractions else 1.0
+
+    mean_f1 = float(np.mean([g['f1'] for g in per_gesture.values()]))
+    score = mean_f1 - latency_weight * latency_penalty / len(GESTURE_ACTIONS)
+    return score, profile, per_gesture
+
+
+def grid_candidates():
+    keys = list(SEARCH_SPACE)
+    for values in itertools.product(*(SEARCH_SPACE[k] for k in keys)):
+        yield dict(zip(keys, values))
+
+
+def random_candidates(trials, seed):
+    rng = random.Random(seed)
+    for _ in range(trials):
+        candidate = {}
+        for key, values in SEARCH_SPACE.items():
+            if key in INTEGER_PARAMS:
+                candidate[key] = rng.choice(values)
+            else:
+                candidate[key] = round(rng.uniform(min(values), max(values)), 2)
+        yield candidate
+
+
+def load_clips(data_dir):
+    """Flatten gesture_data into [(gesture, (N, 4) float64 array), ...]."""
+    clips = []
+    for gesture, recordings in load_clip_arrays(data_dir).items():
+        if gesture not in GESTURE_ACTIONS:
+            continue
+        for clip in recordings:
+            if len(clip):
+                clips.append((gesture, clip))
+    return clips
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune controller thresholds on gesture_data")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--search", choices=("random", "grid"), default="random")
+    parser.add_argument("--trials", type=int, default=2000, help="Candidates for random search")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-weight", type=float, default=0.1,
+                        help="Penalty per unit of mean (normalised) trigger latency")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Worker processes (default: all cores)")
+    parser.add_argument("--output", default="calibration_profile.json")
+    args = parser.parse_args()
+
+    clips = load_clips(args.data_dir)
+    if not clips:
+        print(f"❌ No recordings found in {args.data_dir}/")
+        return 1
+
+    if args.search == "grid":
+        candidates = list(grid_candidates())
+    else:
+        candidates = list(random_candidates(args.trials, args.seed))
+    print(f"🔍 Evaluating {len(candidates)} candidates on {len(clips)} clips "
+          f"with {args.workers} workers...")
+
+    start = time.perf_counter()
+    best = None
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                             initargs=(clips,)) as pool:
+        chunksize = max(1, len(candidates) // (args.workers * 8))
+        # Each worker receives the dataset once via the initializer, then only profiles
+        scores = pool.map(score_profile, candidates, itertools.repeat(None),
+                          itertools.repeat(args.latency_weight), chunksize=chunksize)
+        for result in scores:
+            if best is None or result[0] > best[0]:
+                best = result
+    elapsed = time.perf_counter() - start
+
+    score, profile, per_gesture = best
+    print(f"✅ Done in {elapsed:.1f} s ({len(candidates) / elapsed:,.0f} candidates/s)")
+    print(f"\n🏆 Best score: {score:.3f}")
+    for gesture, metrics in per_gesture.items():
+        print(f"   {gesture:<12} precision {metrics['precision']:.2f}  recall {metrics['recall']:.2f}  "
+              f"latency {metrics['latency_s'] if metrics['latency_s'] is not None else '-'} s")
+
+    with open(args.output, 'w') as f:
+        json.dump({**profile, "tuning": {"score": round(score, 4), "gestures": per_gesture,
+                                         "search": args.search, "candidates": len(candidates)}},
+                  f, indent=2)
+    print(f"\n💾 Profile written to {args.output}")
+    print(f"   Load it with: python3 udp_listener.py --profile {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
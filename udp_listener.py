@@ -1,9 +1,17 @@
+import argparse
+import json
 import socket
+import threading
 import time
-import math
-import statistics
-from collections import deque
-from pynput.keyboard import Controller, Key
+from gesture_engine import SAMPLE_INTERVAL_S, GestureEngine, load_profile
+from session_recorder import SessionRecorder
+from key_backends import BACKENDS, DEFAULT_BACKEND, create_backend
+from key_watchdog import KeyHoldWatchdog
+from key_worker import KeyInjectionWorker
+from sample_ring import DEFAULT_CAPACITY as DEFAULT_RING_CAPACITY, SampleRingWriter
+from sensor_protocol import PacketReceiver, ProtocolError, decode_packet
+from status_display import StatusDisplay, StatusSnapshot
+from stream_stats import StreamStats
 
 # --- PASTE YOUR CALIBRATION PROFILE HERE ---
 CALIBRATION_PROFILE = {
@@ -16,220 +24,382 @@ CALIBRATION_PROFILE = {
 
 HOST_IP = '0.0.0.0'
 PORT = 12345
-GRAVITY_CONSTANT = 9.81  # Earth's gravity constant
-GRAVITY_THRESHOLD = 9.0
 
-keyboard = Controller()
-last_action_time = 0
+# All key presses go through the worker so the receive loop never blocks on
+# keyboard I/O. Created in main() for the chosen --backend.
+key_output = None
 action_cooldown = 0.3
 
-# State tracking with stability buffer
-is_walking = False
-walking_key_pressed = False  # Track if we're currently holding a walking key
-current_walking_key = None   # Track which key is currently pressed
-jump_key_pressed = False     # Track if jump key is currently held
-initial_gyro_heading = None
-total_rotation = 0.0
-last_time = time.time()
-current_state = "IDLE"
-state_buffer = deque(maxlen=5)  # Rolling buffer for state stability
-last_action = "NONE"
-last_action_value = 0.0
-
-def update_status_display(state, facing_dir, rotation_deg, last_action, last_value):
-    """Display clean, single-line status update"""
-    print(f"\rSTATE: {state:7} | FACING: {facing_dir} ({rotation_deg:4.0f}°) | LAST ACTION: {last_action} ({last_value:.1f})", end="", flush=True)
-
-def determine_state_from_sensors(x, y, z):
-    """Determine raw state from sensor readings"""
-    if abs(y) > GRAVITY_THRESHOLD:
-        return "COMBAT"
-    elif abs(x) > GRAVITY_THRESHOLD:
-        return "WALKING"
-    else:
-        return "IDLE"
-
-def get_stable_state(raw_state, state_buffer):
-    """Apply state stability buffer - requires 4/5 consensus to change state"""
-    state_buffer.append(raw_state)
-
-    # Count occurrences of each state in buffer
-    walking_count = state_buffer.count("WALKING")
-    combat_count = state_buffer.count("COMBAT")
-    idle_count = state_buffer.count("IDLE")
-
-    # Require 4/5 consensus to change state (provides stickiness)
-    if walking_count >= 4:
-        return "WALKING"
-    elif combat_count >= 4:
-        return "COMBAT"
-    elif idle_count >= 4:
-        return "IDLE"
-    else:
-        # No consensus, keep current state
-        return None  # Will use previous stable state
-
-
-def manage_sustained_jump(x, y, z, jerk_force, jump_threshold):
-    """Handle sustained jump based on acceleration patterns"""
-    global jump_key_pressed, last_action, last_action_value, last_action_time
-
-    total_acceleration = math.sqrt(x**2 + y**2 + z**2)
-    current_time = time.time()
-
-    # JUMP START: Strong upward jerk detected
-    if jerk_force > jump_threshold and not jump_key_pressed:
-        keyboard.press('z')
-        jump_key_pressed = True
-        last_action = "JUMP_START"
-        last_action_value = jerk_force
-        last_action_time = current_time
-        return "JUMP_START"
-
-    # JUMP CONTINUE: Low total acceleration indicates "airborne" state
-    # (When phone is suspended/floating, total acceleration approaches gravity)
-    elif jump_key_pressed and total_acceleration < 12.0:  # Slightly above gravity
-        # Keep holding jump key while "airborne"
-        last_action = "JUMP_AIRBORNE"
-        last_action_value = total_acceleration
-        return "JUMP_CONTINUE"
-
-    # JUMP END: High acceleration spike indicates landing or strong movement
-    elif jump_key_pressed and (jerk_force > jump_threshold * 0.7 or total_acceleration > 15.0):
-        keyboard.release('z')
-        jump_key_pressed = False
-        last_action = "JUMP_LAND"
-        last_action_value = total_acceleration
-        last_action_time = current_time
-        return "JUMP_END"
-
-    return None
-
-
-def manage_walking_key_press(should_walk, direction_key):
-    """Handle sustained key press for walking"""
-    global walking_key_pressed, current_walking_key
-
-    if should_walk and not walking_key_pressed:
-        # Start walking - press and hold key
-        keyboard.press(direction_key)
-        walking_key_pressed = True
-        current_walking_key = direction_key
-        return "WALK_KEY_PRESS"
-    elif should_walk and walking_key_pressed and current_walking_key != direction_key:
-        # Direction changed - release old key, press new key
-        keyboard.release(current_walking_key)
-        keyboard.press(direction_key)
-        current_walking_key = direction_key
-        return "WALK_DIRECTION_CHANGE"
-    elif not should_walk and walking_key_pressed:
-        # Stop walking - release key
-        keyboard.release(current_walking_key)
-        walking_key_pressed = False
-        current_walking_key = None
-        return "WALK_KEY_RELEASE"
-
-    return None  # No key state change needed
-print("✅ Dynamic Motion Controller is running.")
-print("Face your desired 'forward' direction and start the Android app.")
-print("The first data received will set your starting orientation.")
-print()  # Empty line for status display
-
-with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-    s.bind((HOST_IP, PORT))
+# All gesture state (stability buffer, rotation, held keys) lives in the engine
+# Keys are gesture_engine.DEFAULT_KEYMAP names; the --backend resolves them to real keys
+engine = GestureEngine(CALIBRATION_PROFILE, action_cooldown)
+coalesced_packets = 0  # Packets folded into a newer sample by --drain
+status = StatusSnapshot()  # Packet counters read by the StatusDisplay thread
+stream_stats = StreamStats()  # Loss/reorder/jitter/latency from seq numbers and sender timestamps
+template_matcher = None  # Optional TemplateMatcher for recorded turns (--templates)
+sample_ring = None  # Optional SampleRingWriter for local readers (--shm)
+quiet = False  # Skip the start-up banner (set by tools that drive the pipeline)
+key_lock = threading.Lock()  # Held around engine.act(); shared with the KeyHoldWatchdog
+
+
+def reset_state():
+    """Reset all controller state to its startup values (used by benchmarks/replay)."""
+    global coalesced_packets, stream_stats
+    engine.reset()
+    coalesced_packets = 0
+    stream_stats = StreamStats()
+
+
+def accept_sample(sample, arrival_ns=None):
+    """Drop duplicate and out-of-order packets; unsequenced packets always pass."""
+    if sample.seq is None:
+        return True
+    if arrival_ns is None:
+        arrival_ns = time.monotonic_ns()
+    return stream_stats.accept(sample.seq, sample.timestamp_ns, arrival_ns)
+
+
+def begin_sample(sample):
+    """Per-sample work before the engine: start banner and --shm publishing."""
+    if engine.initial_gyro_heading is None and not quiet:
+        print("▶️ Controller started! 'Forward' direction is set.")
+        print()  # Empty line for status display
+    if sample_ring is not None:
+        sample_ring.publish(sample)
+
+
+def sender_dt_for(sample):
+    """Prefer the sender's clock so Wi-Fi jitter doesn't leak into rotation."""
+    return stream_stats.sender_dt if sample.timestamp_ns is not None else None
+
+
+def match_templates(sample):
+    """Feed --templates; a recognised turn flips the facing direction."""
+    if template_matcher is not None:
+        match = template_matcher.push(sample)
+        if match is not None and match.gesture == "turn_around":
+            engine.turn_around()
+
+
+def process_sensor_sample(sample, current_time):
+    """Sensor stage: feed one sample through the stability buffer and rotation
+    tracking, and return its jerk force. Runs for every received packet."""
+    begin_sample(sample)
+    jerk_force = engine.update(sample, current_time, sender_dt_for(sample))
+    match_templates(sample)
+    return jerk_force
+
+
+def timed_sensor_stage(metrics):
+    """process_sensor_sample with the engine's three parts timed (--metrics)."""
+    perf_ns = time.perf_counter_ns
+    state = metrics.histograms["state"].observe
+    rotation = metrics.histograms["rotation"].observe
+    features = metrics.histograms["features"].observe
+
+    def process(sample, current_time):
+        begin_sample(sample)
+        x, y, z = sample.x, sample.y, sample.z
+        t0 = perf_ns()
+        engine.update_state(x, y, z)
+        t1 = perf_ns()
+        engine.update_rotation(sample.gyro_y, current_time, sender_dt_for(sample))
+        t2 = perf_ns()
+        jerk_force = engine.update_features(x, y, z)
+        match_templates(sample)
+        t3 = perf_ns()
+        state(t1 - t0)
+        rotation(t2 - t1)
+        features(t3 - t2)
+        return jerk_force
+
+    return process
+
+
+def run_output_stage(x, y, z, jerk_force, current_time, coalesced=None):
+    """Output stage: key actions for the newest sample.
+
+    The status line reads engine state directly from the display thread,
+    so nothing is copied here per packet.
+    """
+    with key_lock:
+        actions = engine.act(x, y, z, jerk_force, current_time)
+        if actions:
+            key_output.submit_actions(actions)
+    status.coalesced = coalesced
+
+
+def run_per_packet(receiver):
+    """Original loop: full state machine and display for every packet."""
     while True:
-        data, _ = s.recvfrom(1024)
-        message = data.decode().strip()
-
-        if message.startswith("SENSOR:"):
+        try:
+            # Binary frames and legacy SENSOR: text are auto-detected per packet
+            sample, _ = receiver.receive()
+            if not accept_sample(sample):
+                continue
+            start_ns = time.perf_counter_ns()
+            current_time = time.time()
+            jerk_force = process_sensor_sample(sample, current_time)
+            run_output_stage(sample.x, sample.y, sample.z, jerk_force, current_time)
+            status.record_packets(1, time.perf_counter_ns() - start_ns)
+        except (ValueError, IndexError):
+            pass
+
+
+def run_instrumented(receiver, metrics):
+    """Per-packet loop that times every pipeline stage (--metrics).
+
+    Same behaviour as run_per_packet, with decode, the engine's three sensor
+    parts and the action stage each landing in their own histogram. Kept
+    separate so the default loops carry no timing code.
+    """
+    perf_ns = time.perf_counter_ns
+    decode = metrics.histograms["decode"].observe
+    act = metrics.histograms["action"].observe
+    process = timed_sensor_stage(metrics)
+    view = receiver.view
+    while True:
+        nbytes, _ = receiver.receive_raw()
+        t0 = perf_ns()
+        try:
+            sample = decode_packet(view, nbytes)
+        except ProtocolError:
+            continue
+        if not accept_sample(sample):
+            continue
+        t1 = perf_ns()
+        current_time = time.time()
+        jerk_force = process(sample, current_time)
+        t2 = perf_ns()
+        run_output_stage(sample.x, sample.y, sample.z, jerk_force, current_time)
+        t3 = perf_ns()
+        decode(t1 - t0)
+        act(t3 - t2)
+        status.record_packets(1, t3 - t0)
+
+
+def run_drained(receiver, max_burst, metrics=None):
+    """Drain mode: read every pending datagram in one non-blocking burst.
+
+    All samples go through the stability buffer and jerk computation, but key
+    injection and the status display only run once, for the newest sample.
+    The burst's peak jerk is carried over so a punch/jump spike that lands
+    in an older packet is not lost.
+
+    The samples of a burst queued up since the previous one, so their
+    arrival times are spread evenly back from now over that window (at most
+    one sender interval apart). Samples without a sender timestamp then
+    still get a real rotation dt instead of 0.
+
+    With --metrics the sensor stages, the action stage and the whole burst
+    are timed; decoding happens inside drain() and is not.
+    """
+    global coalesced_packets
+
+    process = process_sensor_sample
+    burst = act = None
+    if metrics is not None:
+        process = timed_sensor_stage(metrics)
+        burst = metrics.histograms["burst"].observe
+        act = metrics.histograms["action"].observe
+    previous_time = None
+    while True:
+        samples = receiver.drain(max_burst)
+        start_ns = time.perf_counter_ns()
+        current_time = time.time()
+        if not samples:
+            continue
+        spacing = SAMPLE_INTERVAL_S
+        if previous_time is not None:
+            spacing = min(spacing, (current_time - previous_time) / len(samples))
+        previous_time = current_time
+
+        peak_jerk = None
+        newest = None
+        processed = 0
+        sample_time = current_time - (len(samples) - 1) * spacing
+        for sample in samples:
+            # accept_sample also sets the sender_dt this sample is processed with
+            if accept_sample(sample):
+                jerk_force = process(sample, sample_time)
+                if peak_jerk is None or jerk_force > peak_jerk:
+                    peak_jerk = jerk_force
+                newest = sample
+                processed += 1
+            sample_time += spacing
+
+        if newest is None:
+            continue
+        coalesced_packets += processed - 1
+        act_ns = time.perf_counter_ns()
+        run_output_stage(newest.x, newest.y, newest.z, peak_jerk,
+                         current_time, coalesced_packets)
+        end_ns = time.perf_counter_ns()
+        status.record_packets(processed, end_ns - start_ns)
+        if burst is not None:
+            act(end_ns - act_ns)
+            burst(end_ns - start_ns)
+
+
+def main():
+    global engine, action_cooldown, template_matcher, key_output, sample_ring
+
+    parser = argparse.ArgumentParser(description="Silksong motion controller UDP listener")
+    parser.add_argument("--drain", action="store_true",
+                        help="Drain all pending packets per wake-up and act only on the newest")
+    parser.add_argument("--max-burst", type=int, default=256,
+                        help="Maximum packets coalesced per burst in --drain mode")
+    parser.add_argument("--status-hz", type=float, default=15.0,
+                        help="Status line refresh rate")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Headless mode: no status line output")
+    parser.add_argument("--stats-json", metavar="PATH",
+                        help="Also write the exit summary (stream + key stats) to this JSON file")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Load thresholds from a profile JSON (e.g. written by tune_thresholds.py)")
+    parser.add_argument("--record", metavar="PATH",
+                        help="Append every raw datagram to a session log for later replay")
+    parser.add_argument("--silence-timeout", type=float, default=0.5,
+                        help="Release held keys after this many seconds without packets (0 = off)")
+    parser.add_argument("--max-jump-hold", type=float, default=2.0,
+                        help="Longest the jump key may stay held, in seconds (0 = unlimited)")
+    parser.add_argument("--max-walk-hold", type=float, default=0.0,
+                        help="Longest a walking key may stay held, in seconds (0 = unlimited)")
+    parser.add_argument("--templates", metavar="DIR",
+                        help="Recognise turns by matching against the recordings in DIR")
+    parser.add_argument("--rcvbuf", type=int, metavar="BYTES",
+                        help="Socket receive buffer size (see udp_load_test.py)")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="Key output backend (null/record press nothing)")
+    parser.add_argument("--shm", metavar="NAME",
+                        help="Publish every accepted sample to a shared-memory ring for local readers (sample_ring.py)")
+    parser.add_argument("--shm-capacity", type=int, default=DEFAULT_RING_CAPACITY, metavar="RECORDS",
+                        help="Records kept in the --shm ring")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Time every pipeline stage; SIGUSR1 prints the histograms")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics (implies --metrics)")
+    parser.add_argument("--flamegraph", metavar="PATH",
+                        help="Folded-stack output for the sampling profiler (SIGUSR2 starts/stops it)")
+    args = parser.parse_args()
+
+    if args.profile:
+        CALIBRATION_PROFILE.update(load_profile(args.profile))
+        action_cooldown = CALIBRATION_PROFILE.get('ACTION_COOLDOWN', action_cooldown)
+        engine = GestureEngine(CALIBRATION_PROFILE, action_cooldown)
+        print(f"📄 Loaded calibration profile from {args.profile}")
+
+    if args.templates:
+        from template_matcher import TemplateMatcher
+        template_matcher = TemplateMatcher.from_recordings(args.templates)
+        print(f"🧩 Loaded {len(template_matcher.templates)} gesture templates from {args.templates}")
+
+    metrics = profiler = None
+    if args.metrics or args.metrics_port or args.flamegraph:
+        from metrics import SamplingProfiler, StageMetrics, install_signal_handlers, start_http_server
+        metrics = StageMetrics(gauges=lambda: {
+            **{f"stream_{k}": v for k, v in stream_stats.summary().items()},
+            **{f"keys_{k}": v for k, v in key_output.stats().items()}})
+        if args.flamegraph:
+            profiler = SamplingProfiler(args.flamegraph)
+        install_signal_handlers(metrics, profiler)
+        if args.metrics_port:
+            try:
+                start_http_server(metrics, port=args.metrics_port, profiler=profiler)
+            except RuntimeError as e:
+                print(f"❌ {e}")
+                return
+            print(f"📈 Metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+
+    # Resources that must be closed on exit are created last, after every
+    # setup step that can still bail out
+    try:
+        backend = create_backend(args.backend)
+    except (ImportError, OSError) as e:
+        print(f"❌ Key backend '{args.backend}' is unavailable: {e}")
+        return
+    key_output = KeyInjectionWorker(backend)
+    if metrics is not None:
+        key_output.histogram = metrics.histograms["key_injection"]
+
+    if args.shm:
+        try:
+            sample_ring = SampleRingWriter(args.shm, args.shm_capacity)
+        except FileExistsError:
+            print(f"❌ Shared memory '{args.shm}' already exists (another listener running?)")
+            backend.close()
+            return
+        print(f"🔗 Publishing samples to ring '{args.shm}' ({args.shm_capacity} records)")
+
+    print("✅ Dynamic Motion Controller is running.")
+    print("Face your desired 'forward' direction and start the Android app.")
+    print("The first data received will set your starting orientation.")
+    print()  # Empty line for status display
+
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            if args.rcvbuf:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, args.rcvbuf)
+                print(f"📦 SO_RCVBUF: {s.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)} bytes")
+            s.bind((HOST_IP, PORT))
+            recorder = SessionRecorder(args.record) if args.record else None
+            receiver = PacketReceiver(s, recorder=recorder)
+            key_output.start()
+            display = None if args.quiet else StatusDisplay(status, args.status_hz, stream_stats, engine)
+            if display:
+                if metrics is not None:
+                    display.histogram = metrics.histograms["display"]
+                display.start()
+            watchdog = KeyHoldWatchdog(engine, key_output, status, args.silence_timeout,
+                                       args.max_jump_hold, args.max_walk_hold, lock=key_lock)
+            watchdog.start()
             try:
-                parts = message.replace("SENSOR:", "").split(',')
-                x, y, z, gyro_y = [float(p) for p in parts]
-
-                # --- Set Initial "Forward" Direction ---
-                if initial_gyro_heading is None:
-                    initial_gyro_heading = gyro_y
-                    print("▶️ Controller started! 'Forward' direction is set.")
-                    print()  # Empty line for status display
-
-                current_time = time.time()
-                delta_time = current_time - last_time
-                last_time = current_time
-
-                # --- STATE STABILITY BUFFER IMPLEMENTATION ---
-                raw_state = determine_state_from_sensors(x, y, z)
-                stable_state = get_stable_state(raw_state, state_buffer)
-
-                if stable_state is not None:
-                    current_state = stable_state
-
-                # --- Relative Rotation Tracking ---
-                effective_gyro = gyro_y - initial_gyro_heading
-                gyro_limit = CALIBRATION_PROFILE['WALK_GYRO_NOISE_LIMIT']
-                if abs(effective_gyro) > gyro_limit:
-                    total_rotation += effective_gyro * delta_time
-
-                # Calculate facing direction and rotation degrees
-                rotation_deg = math.degrees(total_rotation)
-                facing_dir = "RIGHT" if total_rotation < 1.57 else "LEFT"
-
-                # Cooldown check
-                if current_time - last_action_time < action_cooldown:
-                    # Still update status display even during cooldown
-                    update_status_display(current_state, facing_dir,
-                                         rotation_deg, last_action,
-                                         last_action_value)
-                    continue
-
-                if current_state == "WALKING":
-                    walk_amp = CALIBRATION_PROFILE['WALK_SWING_AMPLITUDE']
-                    # Check for swing amplitude to determine if actively walking
-                    currently_walking = abs(z) > walk_amp
-
-                    # Determine direction based on rotation
-                    direction_key = (Key.right if total_rotation < 1.57
-                                   else Key.left)
-
-                    # Manage sustained key press for walking
-                    key_action = manage_walking_key_press(currently_walking, direction_key)
-                    if key_action:
-                        last_action = key_action
-                        last_action_value = abs(z)
-
-                    # Update walking state for display
-                    if currently_walking != is_walking:
-                        is_walking = currently_walking
-
-                    # ENHANCED JUMP PHYSICS - Sustained jump based on acceleration patterns
-                    magnitude = math.sqrt(x**2 + y**2 + z**2)
-                    jerk_force = magnitude - GRAVITY_CONSTANT
-                    jump_threshold = CALIBRATION_PROFILE['JUMP_THRESHOLD']
-
-                    # Use sustained jump logic instead of single tap
-                    jump_action = manage_sustained_jump(x, y, z, jerk_force, jump_threshold)
-                    if jump_action and not jump_action.startswith("JUMP_CONTINUE"):
-                        # Only update timing for start/end actions, not continue
-                        last_action_time = current_time
-
-                elif current_state == "COMBAT":
-                    if is_walking:
-                        is_walking = False
-
-                    # CORRECTED PUNCH PHYSICS - Measure actual jerk force
-                    magnitude = math.sqrt(x**2 + y**2 + z**2)
-                    jerk_force = magnitude - GRAVITY_CONSTANT
-                    punch_threshold = CALIBRATION_PROFILE['PUNCH_THRESHOLD']
-
-                    if jerk_force > punch_threshold:
-                        keyboard.press('x')
-                        keyboard.release('x')
-                        last_action = "PUNCH"
-                        last_action_value = jerk_force
-                        last_action_time = current_time
-
-                # Update real-time status display
-                update_status_display(current_state, facing_dir, rotation_deg,
-                                     last_action, last_action_value)
-
-            except (ValueError, IndexError):
-                pass
\ No newline at end of file
+                if args.drain:
+                    s.setblocking(False)
+                    run_drained(receiver, args.max_burst, metrics)
+                elif metrics is not None:
+                    run_instrumented(receiver, metrics)
+                else:
+                    run_per_packet(receiver)
+            except KeyboardInterrupt:
+                print()
+                if args.drain:
+                    print(f"📊 Coalesced packets: {coalesced_packets}")
+            finally:
+                if profiler is not None and profiler.running:
+                    print(f"🔥 Profile written to {args.flamegraph} ({profiler.stop()} samples)")
+                watchdog.stop()
+                if display:
+                    display.stop()
+                # Never leave a walking/jump key held down after exit
+                for action in engine.release_all():
+                    key_output.submit(action.kind, action.key)
+                key_output.stop()
+                if recorder:
+                    recorder.close()
+                    print(f"💾 Recorded {recorder.records} packets to {args.record}")
+    finally:
+        backend.close()
+        if sample_ring is not None:
+            sample_ring.close()
+
+    stats = key_output.stats()
+    print(f"⌨️  Keys injected: {stats['injected']} | merged: {stats['merged']} | "
+          f"dropped: {stats['dropped']} | errors: {stats['errors']} | "
+          f"latency avg {stats['latency_avg_ms']:.2f} ms, max {stats['latency_max_ms']:.2f} ms")
+
+    # Machine-readable summary on the last line of output
+    summary = {"stream": stream_stats.summary(), "keys": stats,
+               "coalesced_packets": coalesced_packets, "watchdog": watchdog.stats()}
+    if template_matcher is not None:
+        summary["templates"] = template_matcher.stats()
+    if metrics is not None:
+        summary["stages"] = metrics.summary()
+    print(json.dumps(summary))
+    if args.stats_json:
+        with open(args.stats_json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
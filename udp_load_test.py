@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+UDP load generator and saturation soak test for the listener.
+
+Companion to test_udp_protocol.py: instead of printing packets, it sends
+synthetic or gesture_data/ packets over loopback at increasing rates and
+measures where the listener stops keeping up.
+
+By default a sink process runs the listener's own pipeline
+(udp_listener.process_sensor_sample + run_output_stage, `null` key backend)
+on a fresh socket, so every step reports:
+
+- sent:       packets the generator actually sent (and the achieved pps)
+- processed:  packets the listener pipeline finished
+- kernel:     receive-queue drops from /proc/net/udp and SO_RXQ_OVFL
+
+The saturation point is the highest rate whose loss stays below --max-loss.
+--rcvbuf repeats the sweep for several SO_RCVBUF sizes, which shows how
+much buffering helps with bursts (and where it only hides a rate the
+pipeline cannot sustain). Use the result with udp_listener.py --rcvbuf.
+
+Usage:
+    python3 udp_load_test.py
+    python3 udp_load_test.py --rates 100 1000 5000 20000 50000 --burst 32
+    python3 udp_load_test.py --rcvbuf 212992 1048576 4194304 --source gesture_data
+    python3 udp_load_test.py --target 127.0.0.1:12345   # external listener: kernel drops only
+
+With --target the generator cannot see inside the listener: loss counts
+only packets the kernel dropped from the socket queue. For the listener's
+own received/accepted/lost counters, run it with --stats-json and read the
+file after it exits.
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import socket
+import struct
+import time
+
+from sensor_protocol import MAX_PACKET_SIZE, ProtocolError, decode_packet, encode_frame
+
+SINK_PORT = 12445
+SINK_START_TIMEOUT = 5.0  # Seconds to wait for the sink to bind its socket
+DEFAULT_RATES = (100, 500, 1000, 2000, 5000, 10000, 20000, 50000)
+SO_RXQ_OVFL = getattr(socket, "SO_RXQ_OVFL", 40)  # Linux value; not exported by Python
+RCVBUF_SYSCTL = "/proc/sys/net/core/rmem_max"
+
+
+# --- Kernel counters ---
+
+def proc_udp_drops(port):
+    """Receive-queue drops for the socket bound to `port` (None if not found)."""
+    for path in ("/proc/net/udp", "/proc/net/udp6"):
+        try:
+            with open(path) as f:
+                lines = f.readlines()[1:]
+        except OSError:
+            continue
+        for line in lines:
+            fields = line.split()
+            if int(fields[1].rsplit(":", 1)[1], 16) == port:
+                return int(fields[-1])
+    return None
+
+
+def rmem_max():
+    try:
+        with open(RCVBUF_SYSCTL) as f:
+            return int(f.read())
+    except OSError:
+        return None
+
+
+# --- Sink: the listener pipeline on its own socket ---
+
+def run_sink(port, rcvbuf, processed, overflows, ready):
+    """Child process: receive with recvmsg_into (for SO_RXQ_OVFL) and run the
+    listener pipeline on every packet. Counters are shared with the parent."""
+    import udp_listener as listener
+    from key_backends import create_backend
+    from key_worker import KeyInjectionWorker
+
+    listener.key_output = KeyInjectionWorker(create_backend("null"))
+    listener.key_output.start()
+    listener.quiet = True
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        if rcvbuf:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        try:
+            s.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+        except OSError:
+            pass
+        s.bind(('127.0.0.1', port))
+        ready.value = s.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+        buffer = bytearray(MAX_PACKET_SIZE)
+        view = memoryview(buffer)
+        cmsg_size = socket.CMSG_SPACE(4)
+        count = 0
+        while True:
+            nbytes, ancdata, _, _ = s.recvmsg_into([buffer], cmsg_size)
+            for level, kind, data in ancdata:
+                if level == socket.SOL_SOCKET and kind == SO_RXQ_OVFL:
+                    overflows.value = struct.unpack("I", data[:4])[0]
+            try:
+                sample = decode_packet(view, nbytes)
+            except ProtocolError:
+                continue
+            if not listener.accept_sample(sample):
+                continue
+            current_time = time.time()
+            jerk_force = listener.process_sensor_sample(sample, current_time)
+            listener.run_output_stage(sample.x, sample.y, sample.z, jerk_force, current_time)
+            count += 1
+            processed.value = count
+
+
+# --- Generator ---
+
+def load_readings(source):
+    """(x, y, z, gyro_y) rows: 'synthetic' noise around gravity, or a gesture_data directory."""
+    if source == "synthetic":
+        rng = random.Random(0)
+        return [(rng.gauss(0, 2), 9.8 + rng.gauss(0, 2), rng.gauss(0, 3), rng.gauss(0, 1))
+                for _ in range(4096)]
+    from gesture_store import load_clip_arrays
+
+    readings = [tuple(row) for clips in load_clip_arrays(source).values()
+                for clip in clips for row in clip.tolist()]
+    if not readings:
+        raise SystemExit(f"❌ No recordings found in {source}")
+    return readings
+
+
+def send_step(sock, target, readings, rate, duration, burst, first_seq):
+    """Send at `rate` pps for `duration` s, `burst` packets back to back.
+
+    Returns (sent, elapsed_s). Each burst is scheduled on an absolute clock
+    so a late burst is followed by an early one and the average holds.
+    """
+    total = max(int(rate * duration), 1)
+    interval = burst / rate
+    sendto = sock.sendto
+    n = len(readings)
+    sent = 0
+    start = time.perf_counter()
+    for burst_start in range(0, total, burst):
+        due = start + (burst_start // burst) * interval
+        delay = due - time.perf_counter()
+        if delay > 0.0005:
+            time.sleep(delay)
+        for i in range(burst_start, min(burst_start + burst, total)):
+            seq = first_seq + i
+            x, y, z, gyro_y = readings[seq % n]
+            try:
+                sendto(encode_frame(x, y, z, gyro_y, seq, time.monotonic_ns()), target)
+                sent += 1
+            except BlockingIOError:
+                pass
+    return sent, time.perf_counter() - start
+
+
+def sweep(readings, rates, duration, burst, rcvbuf, port, settle):
+    """One throughput-vs-loss curve against a sink with the given SO_RCVBUF."""
+    processed = multiprocessing.RawValue('q', 0)
+    overflows = multiprocessing.RawValue('q', 0)
+    ready = multiprocessing.RawValue('q', 0)
+    sink = multiprocessing.Process(target=run_sink, args=(port, rcvbuf, processed, overflows, ready),
+                                   daemon=True)
+    sink.start()
+    deadline = time.monotonic() + SINK_START_TIMEOUT
+    while not ready.value:
+        if not sink.is_alive():
+            raise RuntimeError(f"Sink exited with code {sink.exitcode} before binding port {port}")
+        if time.monotonic() > deadline:
+            sink.terminate()
+            sink.join()
+            raise RuntimeError(f"Sink did not bind port {port} within {SINK_START_TIMEOUT:.0f} s")
+        time.sleep(0.01)
+
+    rows = []
+    seq = 0
+    target = ('127.0.0.1', port)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for rate in rates:
+            before = (processed.value, overflows.value, proc_udp_drops(port))
+            sent, elapsed = send_step(sock, target, readings, rate, duration, burst, seq)
+            seq += sent
+            time.sleep(settle)  # Let the sink drain its queue
+            after = (processed.value, overflows.value, proc_udp_drops(port))
+            done = after[0] - before[0]
+            rows.append({
+                "rate": rate,
+                "sent": sent,
+                "sent_pps": round(sent / elapsed) if elapsed > 0 else 0,
+                "processed": done,
+                "processed_pps": round(done / elapsed) if elapsed > 0 else 0,
+                "loss": round(1 - done / sent, 5) if sent else 0.0,
+                "rxq_ovfl": after[1] - before[1],
+                "proc_drops": (after[2] - before[2]) if before[2] is not None else None,
+            })
+    sink.terminate()
+    sink.join()
+    return {"rcvbuf_requested": rcvbuf, "rcvbuf_effective": ready.value, "steps": rows}
+
+
+def sweep_external(readings, rates, duration, burst, host, port, settle):
+    """Send to an already running listener; only kernel drops are visible.
+
+    Packets the listener received but discarded (malformed, duplicate,
+    stale) are not counted, so the loss is a lower bound. Its own counters
+    come from udp_listener.py --stats-json, which is written only on exit.
+    """
+    rows = []
+    seq = 0
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for rate in rates:
+            before = proc_udp_drops(port)
+            sent, elapsed = send_step(sock, (host, port), readings, rate, duration, burst, seq)
+            seq += sent
+            time.sleep(settle)
+            after = proc_udp_drops(port)
+            drops = (after - before) if before is not None and after is not None else None
+            rows.append({
+                "rate": rate,
+                "sent": sent,
+                "sent_pps": round(sent / elapsed) if elapsed > 0 else 0,
+                "proc_drops": drops,
+                "loss": round(drops / sent, 5) if drops is not None and sent else None,
+            })
+    return {"rcvbuf_requested": None, "rcvbuf_effective": None, "steps": rows}
+
+
+def saturation_point(steps, max_loss):
+    """Highest tested rate whose loss stayed at or below max_loss."""
+    ok = [s["rate"] for s in steps if s["loss"] is not None and s["loss"] <= max_loss]
+    return max(ok) if ok else None
+
+
+def print_curve(result, max_loss):
+    steps = result["steps"]
+    if result["rcvbuf_effective"]:
+        print(f"\n📦 SO_RCVBUF requested {result['rcvbuf_requested'] or 'default'}, "
+              f"effective {result['rcvbuf_effective']} bytes")
+    print(f"{'rate':>8} {'sent pps':>9} {'done pps':>9} {'loss':>8} {'RXQ_OVFL':>9} {'/proc drops':>12}  curve")
+    for s in steps:
+        loss = s["loss"]
+        bar = "" if loss is None else "█" * round(min(loss, 1.0) * 40)
+        loss_text = "n/a" if loss is None else f"{loss * 100:.2f}%"
+        print(f"{s['rate']:>8} {s['sent_pps']:>9} {s.get('processed_pps', '-'):>9} {loss_text:>8} "
+              f"{s.get('rxq_ovfl', '-'):>9} {str(s['proc_drops']):>12}  {bar}")
+    point = saturation_point(steps, max_loss)
+    print(f"🎯 Saturation point (loss ≤ {max_loss * 100:.2f}%): "
+          f"{f'{point} pps' if point else 'below the lowest tested rate'}")
+    return point
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UDP load generator and saturation soak test")
+    parser.add_argument("--rates", type=int, nargs="+", default=list(DEFAULT_RATES),
+                        help="Packets per second to test (100 to 50000)")
+    parser.add_argument("--duration", type=float, default=2.0, help="Seconds per rate step")
+    parser.add_argument("--burst", type=int, default=1,
+                        help="Packets sent back to back per burst (same average rate)")
+    parser.add_argument("--source", default="synthetic",
+                        help="'synthetic' or a recordings directory such as gesture_data")
+    parser.add_argument("--rcvbuf", type=int, nargs="+", default=[0],
+                        help="SO_RCVBUF sizes to sweep (0 = system default)")
+    parser.add_argument("--max-loss", type=float, default=0.001,
+                        help="Loss fraction still counted as keeping up")
+    parser.add_argument("--settle", type=float, default=0.3,
+                        help="Pause after each step so the listener can drain")
+    parser.add_argument("--port", type=int, default=SINK_PORT, help="Port for the sink")
+    parser.add_argument("--target", metavar="HOST:PORT",
+                        help="Load an already running listener instead of the built-in sink "
+                             "(loss counts kernel drops only)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to JSON")
+    args = parser.parse_args()
+
+    if args.burst < 1:
+        parser.error("--burst must be at least 1")
+    readings = load_readings(args.source)
+    print(f"🚀 UDP load test: {len(args.rates)} rates x {args.duration:.1f} s, "
+          f"burst {args.burst}, source {args.source}")
+
+    results = []
+    if args.target:
+        host, port = args.target.rsplit(":", 1)
+        result = sweep_external(readings, args.rates, args.duration, args.burst, host, int(port),
+                                args.settle)
+        result["saturation_pps"] = print_curve(result, args.max_loss)
+        results.append(result)
+    else:
+        for rcvbuf in args.rcvbuf:
+            try:
+                result = sweep(readings, args.rates, args.duration, args.burst, rcvbuf, args.port,
+                               args.settle)
+            except RuntimeError as e:
+                raise SystemExit(f"❌ {e}")
+            result["saturation_pps"] = print_curve(result, args.max_loss)
+            results.append(result)
+
+    if len(results) > 1:
+        best = max(results, key=lambda r: (r["saturation_pps"] or 0, -(r["rcvbuf_effective"] or 0)))
+        if best["rcvbuf_requested"]:
+            print(f"\n💡 Smallest SO_RCVBUF reaching the best saturation point: "
+                  f"{best['rcvbuf_requested']} (udp_listener.py --rcvbuf {best['rcvbuf_requested']})")
+        else:
+            print("\n💡 The default SO_RCVBUF already reaches the best saturation point")
+        limit = rmem_max()
+        if limit is not None and any(r["rcvbuf_requested"] > limit for r in results):
+            print(f"⚠️ Sizes above net.core.rmem_max ({limit}) are capped by the kernel")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+WebSocket ingest for the motion controller.
+
+Over UDP the phone sends one datagram per sensor update, and the host pays
+a recvfrom() plus a decode for every sample. This transport carries batched
+frames instead (several samples per message, each with its own timestamp
+offset, see sensor_protocol.py), so the per-message cost is shared by the
+whole batch. Samples are fed through the same GestureEngine as
+udp_listener.py, strictly in order; plain 32-byte frames and SENSOR: text
+messages are accepted too.
+
+Batching trades latency for cost: a batch of N samples holds the first one
+back by N-1 sensor intervals on the sender, so keep N small for play.
+
+Usage:
+    python3 ws_ingest.py serve [--port 8765] [--profile calibration_profile.json]
+    python3 ws_ingest.py replay ws://127.0.0.1:8765 [--batch 4] [--speed 1.0]
+    python3 ws_ingest.py compare [--samples 50000] [--batch 1 16] [--rate 2000]
+
+`replay` is a stand-in for the phone: it streams the clips in gesture_data/
+as batched frames. `compare` pushes the same samples through the UDP path
+and the WebSocket path on localhost and reports throughput and receive-side
+syscalls per sample. Flooding (the default) lets TCP coalesce many frames
+into one recv(); --rate paces the senders like a real phone.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import selectors
+import socket
+import threading
+import time
+
+from gesture_engine import DEFAULT_ACTION_COOLDOWN, DEFAULT_PROFILE, GestureEngine, load_profile
+from gesture_store import DATA_DIR, SAMPLE_INTERVAL_NS, load_clip_arrays
+from key_backends import BACKENDS, DEFAULT_BACKEND, create_backend
+from key_watchdog import KeyHoldWatchdog
+from key_worker import KeyInjectionWorker
+from sensor_protocol import (PacketReceiver, ProtocolError, decode_samples,
+                             encode_batch, encode_frame)
+from status_display import StatusSnapshot
+from stream_stats import StreamStats
+
+HOST_IP = '0.0.0.0'
+WS_PORT = 8765
+UDP_PORT = 12345
+DEFAULT_BATCH = 4
+
+
+class WebSocketIngest:
+    """Decodes WebSocket messages and runs every sample through one engine.
+
+    All connections feed the same engine, like all senders feed the one
+    engine in udp_listener.py; use multi_device_server.py for per-device state.
+    """
+
+    def __init__(self, engine, key_output):
+        self.engine = engine
+        self.key_output = key_output
+        self.stream_stats = StreamStats()
+        self.status = StatusSnapshot()  # Packet counter watched by the KeyHoldWatchdog
+        self.lock = threading.Lock()  # Held around engine steps; shared with the watchdog
+        self.messages = 0
+        self.samples = 0
+        self.rejected = 0
+
+    def handle_message(self, message):
+        """Process one message; returns the number of samples it carried."""
+        if isinstance(message, str):
+            message = message.encode()
+        try:
+            samples = decode_samples(message)
+        except ProtocolError:
+            self.rejected += 1
+            return 0
+        self.messages += 1
+        if not samples:
+            return 0  # Valid batch frame with count 0
+        self.samples += len(samples)
+
+        arrival_ns = time.monotonic_ns()
+        current_time = time.time()
+        stream_stats = self.stream_stats
+        engine = self.engine
+        submit_actions = self.key_output.submit_actions
+        # The newest sample arrived now; older ones in the batch get their
+        # sender offsets back from it, so cooldowns run on the same clock as UDP
+        newest_ns = samples[-1].timestamp_ns
+        with self.lock:
+            for sample in samples:
+                sample_time = current_time
+                if newest_ns is not None and sample.timestamp_ns is not None:
+                    sample_time -= (newest_ns - sample.timestamp_ns) / 1e9
+                sender_dt = None
+                if sample.seq is not None:
+                    if not stream_stats.accept(sample.seq, sample.timestamp_ns, arrival_ns):
+                        continue
+                    if sample.timestamp_ns is not None:
+                        sender_dt = stream_stats.sender_dt
+                actions = engine.step(sample, sample_time, sender_dt)
+                if actions:
+                    submit_actions(actions)
+        self.status.record_packets(len(samples), time.monotonic_ns() - arrival_ns)
+        return len(samples)
+
+    def release_keys(self):
+        """Release every key the engine holds; returns how many were released."""
+        with self.lock:
+            actions = self.engine.release_all()
+            if actions:
+                self.key_output.submit_actions(actions)
+        return len(actions)
+
+    async def handler(self, websocket, path=None):
+        """Connection handler for websockets.serve() (path is for websockets < 13)."""
+        print(f"🔌 Client connected: {websocket.remote_address}")
+        try:
+            async for message in websocket:
+                self.handle_message(message)
+        finally:
+            # Keys held for this client would otherwise stay down until exit
+            released = self.release_keys()
+            print(f"👋 Client disconnected: {websocket.remote_address}"
+                  + (f", released {released} held key(s)" if released else ""))
+
+    def summary(self):
+        return {
+            "messages": self.messages,
+            "samples": self.samples,
+            "samples_per_message": round(self.samples / self.messages, 2) if self.messages else 0.0,
+            "rejected": self.rejected,
+            "stream": self.stream_stats.summary(),
+        }
+
+
+async def serve(ingest, host, port, stop=None):
+    """Accept WebSocket clients until cancelled (or until `stop` is set)."""
+    import websockets
+
+    async with websockets.serve(ingest.handler, host, port, compression=None):
+        print(f"📡 WebSocket ingest on ws://{host}:{port}")
+        if stop is None:
+            await asyncio.Future()
+        else:
+            await stop.wait()
+
+
+# --- Stand-in client ---
+
+def replay_readings(data_dir=DATA_DIR):
+    """All recorded clips back to back as (x, y, z, gyro_y) tuples."""
+    readings = []
+    for clips in load_clip_arrays(data_dir).values():
+        for clip in clips:
+            readings.extend(tuple(row) for row in clip.tolist())
+    return readings
+
+
+def batch_frames(readings, batch, first_seq=0, interval_ns=SAMPLE_INTERVAL_NS, device_id=0):
+    """Yield (send_offset_ns, frame) with `batch` readings per frame.
+
+    Readings are spaced `interval_ns` apart on the sender clock; each frame
+    is due when its last reading would have been sampled.
+    """
+    for start in range(0, len(readings), batch):
+        chunk = readings[start:start + batch]
+        base_ns = (first_seq + start) * interval_ns
+        frame = encode_batch([(i * interval_ns, *r) for i, r in enumerate(chunk)],
+                             first_seq + start, base_ns, device_id)
+        yield base_ns + (len(chunk) - 1) * interval_ns, frame
+
+
+async def replay(uri, readings, batch=DEFAULT_BATCH, speed=1.0, loops=1):
+    """Send readings to a WebSocket ingest server; speed 0 sends as fast as possible."""
+    import websockets
+
+    sent = 0
+    async with websockets.connect(uri, compression=None) as websocket:
+        start = time.monotonic_ns()
+        for loop_index in range(loops):
+            first_seq = loop_index * len(readings)
+            for due_ns, frame in batch_frames(readings, batch, first_seq):
+                if speed > 0:
+                    delay = (due_ns / speed - (time.monotonic_ns() - start)) / 1e9
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                await websocket.send(frame)
+                sent += 1
+    return sent
+
+
+# --- UDP vs WebSocket comparison ---
+
+class CountingSelector(selectors.DefaultSelector):
+    """Selector that counts wait syscalls and ready events for the event loop.
+
+    Every select() is one epoll_wait()/select() syscall, and every ready
+    read event makes the transport issue one recv(), so together they are
+    the receive-side syscall count of the asyncio path.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.waits = 0
+        self.events = 0
+
+    def select(self, timeout=None):
+        ready = super().select(timeout)
+        self.waits += 1
+        self.events += len(ready)
+        return ready
+
+
+def _send_udp(port, readings, rate):
+    start = time.monotonic()
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        for seq, (x, y, z, gyro_y) in enumerate(readings):
+            if rate > 0:
+                delay = seq / rate - (time.monotonic() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            elif seq % 64 == 63:
+                time.sleep(0)  # Yield so loopback can't overrun the receive buffer
+            s.sendto(encode_frame(x, y, z, gyro_y, seq, seq * SAMPLE_INTERVAL_NS), ('127.0.0.1', port))
+
+
+def _send_ws(port, readings, batch, rate):
+    speed = rate * SAMPLE_INTERVAL_NS / 1e9
+    asyncio.run(replay(f"ws://127.0.0.1:{port}", readings, batch, speed))
+
+
+def _stream(total, data_dir):
+    base = replay_readings(data_dir)
+    return [base[i % len(base)] for i in range(total)]
+
+
+def _fresh_engine():
+    return GestureEngine(DEFAULT_PROFILE, DEFAULT_ACTION_COOLDOWN)
+
+
+def compare_udp(readings, port, rate=0):
+    """Receive `readings` over UDP through PacketReceiver + engine.step."""
+    engine = _fresh_engine()
+    stream_stats = StreamStats()
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+        s.bind(('127.0.0.1', port))
+        receiver = PacketReceiver(s)
+        sender = multiprocessing.Process(target=_send_udp, args=(port, readings, rate))
+        sender.start()
+        processed = recv_calls = 0
+        first = last = None
+        s.settimeout(2.0)
+        try:
+            while processed < len(readings):
+                sample, _ = receiver.receive()
+                recv_calls += 1
+                if first is None:
+                    first = time.perf_counter()
+                    s.settimeout(0.5)  # Stop once the sender is done (losses)
+                if stream_stats.accept(sample.seq, sample.timestamp_ns, time.monotonic_ns()):
+                    engine.step(sample, time.time(), stream_stats.sender_dt)
+                processed += 1
+                last = time.perf_counter()
+        except socket.timeout:
+            pass
+        sender.join()
+    elapsed = (last - first) if first is not None else 0.0
+    return {
+        "transport": "udp",
+        "samples": processed,
+        "lost": len(readings) - processed,
+        "messages": processed,
+        "elapsed_s": round(elapsed, 4),
+        "samples_per_s": round(processed / elapsed) if elapsed > 0 else 0,
+        "syscalls_per_sample": round(recv_calls / processed, 3) if processed else 0.0,
+    }
+
+
+def compare_ws(readings, port, batch, rate=0):
+    """Receive `readings` as batched WebSocket frames through WebSocketIngest."""
+    key_output = KeyInjectionWorker(create_backend("null"))
+    ingest = WebSocketIngest(_fresh_engine(), key_output)
+    selector = CountingSelector()
+    loop = asyncio.SelectorEventLoop(selector)
+    first = last = stop = None
+    handle_message = ingest.handle_message
+
+    def timed_handle(message):
+        nonlocal first, last
+        if first is None:
+            first = time.perf_counter()
+            selector.waits = selector.events = 0
+        handle_message(message)
+        last = time.perf_counter()
+        if ingest.samples >= len(readings):
+            stop.set()
+        return 0
+
+    ingest.handle_message = timed_handle
+
+    async def run():
+        nonlocal stop
+        stop = asyncio.Event()
+        server = asyncio.create_task(serve(ingest, '127.0.0.1', port, stop))
+        await asyncio.sleep(0.2)
+        sender = multiprocessing.Process(target=_send_ws, args=(port, readings, batch, rate))
+        sender.start()
+        try:
+            await asyncio.wait_for(server, timeout=60)
+        finally:
+            sender.join()
+
+    key_output.start()
+    try:
+        loop.run_until_complete(run())
+    finally:
+        loop.close()
+        key_output.stop()
+
+    elapsed = (last - first) if first is not None else 0.0
+    syscalls = selector.waits + selector.events
+    return {
+        "transport": f"websocket (batch {batch})",
+        "samples": ingest.samples,
+        "lost": len(readings) - ingest.samples,
+        "messages": ingest.messages,
+        "elapsed_s": round(elapsed, 4),
+        "samples_per_s": round(ingest.samples / elapsed) if elapsed > 0 else 0,
+        "syscalls_per_sample": round(syscalls / ingest.samples, 3) if ingest.samples else 0.0,
+    }
+
+
+def print_comparison(results):
+    print(f"{'transport':<22} {'samples':>8} {'lost':>6} {'messages':>9} {'samples/s':>10} {'syscalls/sample':>16}")
+    for r in results:
+        print(f"{r['transport']:<22} {r['samples']:>8} {r['lost']:>6} {r['messages']:>9} "
+              f"{r['samples_per_s']:>10} {r['syscalls_per_sample']:>16.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket ingest for the motion controller")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = sub.add_parser("serve", help="Run the controller with WebSocket ingest")
+    serve_parser.add_argument("--host", default=HOST_IP)
+    serve_parser.add_argument("--port", type=int, default=WS_PORT)
+    serve_parser.add_argument("--profile", metavar="PATH",
+                              help="Load thresholds from a profile JSON (e.g. written by tune_thresholds.py)")
+    serve_parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                              help="Key output backend (null/record press nothing)")
+    serve_parser.add_argument("--silence-timeout", type=float, default=0.5,
+                              help="Release held keys after this many seconds without samples (0 = off)")
+    serve_parser.add_argument("--max-jump-hold", type=float, default=2.0,
+                              help="Longest the jump key may stay held, in seconds (0 = unlimited)")
+    serve_parser.add_argument("--max-walk-hold", type=float, default=0.0,
+                              help="Longest a walking key may stay held, in seconds (0 = unlimited)")
+
+    replay_parser = sub.add_parser("replay", help="Stream gesture_data/ recordings to a server")
+    replay_parser.add_argument("uri", nargs="?", default=f"ws://127.0.0.1:{WS_PORT}")
+    replay_parser.add_argument("--data-dir", default=DATA_DIR)
+    replay_parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="Samples per frame")
+    replay_parser.add_argument("--speed", type=float, default=1.0,
+                               help="Playback speed (0 = as fast as possible)")
+    replay_parser.add_argument("--loops", type=int, default=1)
+
+    compare_parser = sub.add_parser("compare", help="UDP vs WebSocket throughput on localhost")
+    compare_parser.add_argument("--data-dir", default=DATA_DIR)
+    compare_parser.add_argument("--samples", type=int, default=50_000)
+    compare_parser.add_argument("--batch", type=int, nargs="+", default=[1, 16],
+                                help="WebSocket batch sizes to test")
+    compare_parser.add_argument("--rate", type=float, default=0,
+                                help="Samples/sec to send (0 = as fast as possible)")
+    compare_parser.add_argument("--udp-port", type=int, default=UDP_PORT + 100)
+    compare_parser.add_argument("--ws-port", type=int, default=WS_PORT + 100)
+    compare_parser.add_argument("--json", metavar="PATH", help="Also write the results to JSON")
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        readings = replay_readings(args.data_dir)
+        start = time.perf_counter()
+        frames = asyncio.run(replay(args.uri, readings, args.batch, args.speed, args.loops))
+        elapsed = time.perf_counter() - start
+        print(f"📤 Sent {len(readings) * args.loops} samples in {frames} frames "
+              f"({elapsed:.2f} s)")
+        return
+
+    if args.command == "compare":
+        readings = _stream(args.samples, args.data_dir)
+        results = [compare_udp(readings, args.udp_port, args.rate)]
+        for batch in args.batch:
+            results.append(compare_ws(readings, args.ws_port, batch, args.rate))
+        print_comparison(results)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent=2)
+        return
+
+    profile = dict(DEFAULT_PROFILE)
+    if args.profile:
+        profile.update(load_profile(args.profile))
+        print(f"📄 Loaded calibration profile from {args.profile}")
+    try:
+        backend = create_backend(args.backend)
+    except (ImportError, OSError) as e:
+        print(f"❌ Key backend '{args.backend}' is unavailable: {e}")
+        return
+    engine = GestureEngine(profile, profile.get('ACTION_COOLDOWN', DEFAULT_ACTION_COOLDOWN))
+    key_output = KeyInjectionWorker(backend)
+    ingest = WebSocketIngest(engine, key_output)
+    watchdog = KeyHoldWatchdog(engine, key_output, ingest.status, args.silence_timeout,
+                               args.max_jump_hold, args.max_walk_hold, lock=ingest.lock)
+
+    print("✅ Dynamic Motion Controller is running (WebSocket ingest).")
+    key_output.start()
+    watchdog.start()
+    try:
+        asyncio.run(serve(ingest, args.host, args.port))
+    except KeyboardInterrupt:
+        print()
+    finally:
+        watchdog.stop()
+        ingest.release_keys()
+        key_output.stop()
+        backend.close()
+
+    stats = key_output.stats()
+    print(f"⌨️  Keys injected: {stats['injected']} | merged: {stats['merged']} | "
+          f"dropped: {stats['dropped']} | errors: {stats['errors']}")
+    print(json.dumps({**ingest.summary(), "keys": stats, "watchdog": watchdog.stats()}))
+
+
+if __name__ == "__main__":
+    main()